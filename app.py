@@ -1,56 +1,195 @@
 # Full `app.py` with Caching, Brave Search API, sentiment analysis, and duplicate filtering
 
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-import requests
 import csv
-import yfinance as yf
-from openai import OpenAI
 import re
 from dotenv import load_dotenv
 import os
 import json
+import base64
+import hashlib
+import hmac
 import logging
-from datetime import datetime, timedelta
+import asyncio
+import random
+import threading
+import time
+import functools
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+from brave import BraveClient, BraveSearchError
+from compression import CompressionMiddleware
+from holdings_store import HoldingsStore
+from live_prices import PriceHub
+from llm_cache import LLMCache, article_key, make_key
+from metrics import (
+    CACHE_REQUESTS, CONTENT_TYPE, REGISTRY, UPSTREAM_ERRORS, UPSTREAM_RETRIES,
+    collect_timings, record_openai_usage, server_timing, timed, timed_await,
+)
+from news_store import open_market_store, open_news_store, parse_timestamp
+from prefilter import prefilter_articles
+from price_store import SUMMARY_FIELDS, PriceStore
+from symbol_metadata import SYMBOL_FUNDAMENTALS_TTL_HOURS, MetadataStore, SymbolOverrides, apply_overrides
 
 load_dotenv()  # Load variables from .env into the environment
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app):
+    if os.getenv("DATABASE_URL"):
+        # The news and market stores live in Postgres; make sure their tables (and columns) exist.
+        from database import create_db_and_tables
+        try:
+            await create_db_and_tables()
+        except Exception as e:
+            logging.error(f"Could not create or migrate the database tables: {e!r}")
+    global _preload_task
+    _preload_task = asyncio.create_task(asyncio.to_thread(preload_dependencies))
+    scheduler = asyncio.create_task(refresh_scheduler()) if REFRESH_SCHEDULER_ENABLED else None
+    if PREWARM_ON_STARTUP:
+        # Traffic is accepted once this returns; a slow prewarm carries on in the background.
+        _, pending = await asyncio.wait({start_prewarm()}, timeout=PREWARM_STARTUP_TIMEOUT_SECONDS)
+        if pending:
+            logging.warning(f"[prewarm] Still running after {PREWARM_STARTUP_TIMEOUT_SECONDS}s; accepting traffic meanwhile")
+    yield
+    # Stop background work before the clients it uses are closed.
+    await cancel_background_tasks(scheduler)
+    await price_hub.close()
+    await brave_client.close()
+
+app = FastAPI(lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
 BRAVE_API_KEY = os.getenv("BRAVE_API_KEY")
 openai_api_key = os.getenv("OPENAI_API_KEY")
-BRAVE_NEWS_ENDPOINT = "https://api.search.brave.com/res/v1/news/search"
-CACHE_FILE = "cache.json"
 CACHE_DURATION_HOURS = 4  # How long to keep cache data before refreshing
+NEWS_WINDOW_DAYS = 7  # Articles older than this are searched for no more and evicted from the cache
+MAX_CONCURRENT_SYMBOLS = int(os.getenv("MAX_CONCURRENT_SYMBOLS", "8"))  # Symbols processed in parallel per page load
+SYMBOL_TIMEOUT_SECONDS = float(os.getenv("SYMBOL_TIMEOUT_SECONDS", "90"))  # Per-symbol budget for news/price fetches
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "10"))  # Articles scored per GPT call
+LLM_BATCH_RETRIES = int(os.getenv("LLM_BATCH_RETRIES", "2"))  # Extra attempts for articles missing from a batch response
+MARKET_FIELDS = SUMMARY_FIELDS
+REFRESH_SCHEDULER_ENABLED = os.getenv("REFRESH_SCHEDULER_ENABLED", "1") == "1"
+REFRESH_INTERVAL_SECONDS = float(os.getenv("REFRESH_INTERVAL_SECONDS", "300"))  # How often the scheduler looks for expiring symbols
+REFRESH_AHEAD_MINUTES = float(os.getenv("REFRESH_AHEAD_MINUTES", "30"))  # Refresh this long before an entry goes stale
+REFRESH_JITTER_SECONDS = float(os.getenv("REFRESH_JITTER_SECONDS", "120"))  # Random spread so refreshes don't fire together
+MARKET_CACHE_SECONDS = float(os.getenv("MARKET_CACHE_SECONDS", "60"))  # Reuse one bulk price download across page views
+HEADLINES_CACHE_SECONDS = float(os.getenv("HEADLINES_CACHE_SECONDS", "300"))  # Shared by every dashboard tab and user
+STREAM_HOLDINGS = os.getenv("STREAM_HOLDINGS", "1") == "1"  # Default for the homepage `stream` query parameter
+LIVE_PRICES_ENABLED = os.getenv("LIVE_PRICES_ENABLED", "1") == "1"  # Push price updates to open dashboards
+LIVE_PRICES_INTERVAL_SECONDS = float(os.getenv("LIVE_PRICES_INTERVAL_SECONDS", "30"))  # Quote poll interval while anyone is watching
+LIVE_PRICES_KEEPALIVE_SECONDS = 15  # Comment line on quiet streams so proxies don't close them
+HOLDINGS_PAGE_SIZE = int(os.getenv("HOLDINGS_PAGE_SIZE", "24"))  # Cards rendered up front, then per lazy-loaded batch; default /api/holdings page
+HOLDINGS_MAX_PAGE_SIZE = 200
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "500"))  # Smaller responses go out uncompressed
+PREWARM_ON_STARTUP = os.getenv("PREWARM_ON_STARTUP", "0") == "1"  # Fill every cache before accepting traffic (see prewarm.py)
+PREWARM_STARTUP_TIMEOUT_SECONDS = float(os.getenv("PREWARM_STARTUP_TIMEOUT_SECONDS", "15"))
+PREWARM_TOKEN = os.getenv("PREWARM_TOKEN")  # Bearer token for POST /api/prewarm; the route is off without it
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "0") == "1"  # Per-stage breakdown in a Server-Timing response header
+LLM_MODEL = "gpt-4o-mini"
+# Bump a prompt's version whenever its wording changes so cached answers from the old prompt are not reused.
+PHRASES_PROMPT_VERSION = "1"
+BATCH_SCORE_PROMPT_VERSION = "1"
 
-client = OpenAI(api_key=openai_api_key)
+# openai and yfinance (with pandas behind it) take most of the import time, so they are not
+# imported with this module; that keeps cold starts short. `lifespan` loads them in a worker
+# thread once the app is up, so the first request that needs them doesn't pay for the import.
+_openai_client = None
+_openai_client_lock = threading.Lock()
+_preload_task = None
+_cpu_pool = None  # Process pool for CPU-bound steps while `prewarm` runs; worker threads otherwise
 
-# --- Caching Functions ---
-def load_cache():
-    """Loads the cache from a JSON file."""
+def preload_dependencies():
+    """Imports yfinance and creates the OpenAI client; runs in a worker thread after startup."""
     try:
-        with open(CACHE_FILE, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
+        import yfinance  # noqa: F401
+        openai_client()
+    except Exception as e:
+        logging.warning(f"Preloading dependencies failed; they load on first use instead: {e!r}")
+
+def openai_client():
+    """The OpenAI client, created on the first GPT call."""
+    global _openai_client
+    with _openai_client_lock:
+        if _openai_client is None:
+            from openai import OpenAI
+            _openai_client = OpenAI(api_key=openai_api_key)
+        return _openai_client
 
-def save_cache(cache_data):
-    """Saves the cache to a JSON file."""
-    with open(CACHE_FILE, 'w') as f:
-        json.dump(cache_data, f, indent=4)
+async def run_cpu_bound(fn, *args, **kwargs):
+    """Runs `fn` in the process pool when one is set up, otherwise in a worker thread."""
+    if _cpu_pool is None:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(_cpu_pool, functools.partial(fn, *args, **kwargs))
+
+brave_client = BraveClient(BRAVE_API_KEY)
+
+# --- Caching Functions ---
+news_store = open_news_store()
+market_store = open_market_store()
+llm_cache = LLMCache()
+price_store = PriceStore()
+holdings_store = HoldingsStore()
+metadata_store = MetadataStore()
+symbol_overrides = SymbolOverrides()
+
+# --- Metrics ---
+async def add_server_timing(request, call_next):
+    """Adds a Server-Timing header summing the stages timed while the response was prepared."""
+    with collect_timings() as timings:
+        response = await call_next(request)
+    if timings:
+        response.headers["Server-Timing"] = server_timing(timings)
+    return response
+
+if SERVER_TIMING_ENABLED:
+    app.middleware("http")(add_server_timing)
+
+# gzip (or br, when the brotli package is installed) for every response, streamed ones included.
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
+
+def cache_age(entry):
+    """How old a cache entry is."""
+    return datetime.now(timezone.utc) - parse_timestamp(entry['timestamp'])
+
+def is_entry_fresh(entry):
+    return cache_age(entry) < timedelta(hours=CACHE_DURATION_HOURS)
 
 # --- Core Functions ---
 def load_holdings(path="holdings.csv"):
+    """Holdings synced from Kite by `main.py`, falling back to the CSV export until the first sync."""
+    rows = holdings_store.load("holdings")
+    if rows or holdings_store.last_synced("holdings"):
+        return rows
     with open(path, newline="", encoding='utf-8') as f:
         return list(csv.DictReader(f))
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
+def chat_completion(helper, **kwargs):
+    """One OpenAI chat completion, timed as stage `openai.<helper>` with its token usage recorded."""
+    with timed(f"openai.{helper}"):
+        try:
+            resp = openai_client().chat.completions.create(model=LLM_MODEL, **kwargs)
+        except Exception:
+            UPSTREAM_ERRORS.inc(upstream="openai")
+            raise
+    record_openai_usage(helper, resp)
+    return resp
+
 def expand_query_with_gpt(company_name, sector, description):
-    # This function remains the same
+    cache_key = make_key(
+        "phrases", LLM_MODEL, PHRASES_PROMPT_VERSION,
+        company=company_name, sector=sector, description=description,
+    )
+    cached = llm_cache.get(cache_key)
+    if cached:
+        logging.info(f"[GPT cache] Reusing search phrases for {company_name!r}")
+        return cached
     prompt = (
         f"You are a financial news search expert creating queries for the Brave Search API.\n"
         f"Company: \"{company_name}\" (sector: {sector})\n"
@@ -62,175 +201,803 @@ def expand_query_with_gpt(company_name, sector, description):
     )
     try:
         logging.info(f"[GPT] Generating search phrases for {company_name!r}")
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini", response_format={"type": "json_object"},
+        resp = chat_completion(
+            "phrases", response_format={"type": "json_object"},
             messages=[{"role": "user", "content": prompt}], temperature=0.5,
         )
         result = json.loads(resp.choices[0].message.content)
         phrases = result.get("phrases", [])
         logging.info(f"[GPT] Generated phrases: {phrases}")
+        if phrases:
+            llm_cache.set(cache_key, phrases)
         return phrases
     except Exception as e:
         logging.error(f"⚠️ Phrase generation failed for {company_name!r}: {e}")
         return []
 
-def is_article_relevant(article, company_name):
-    # This function remains the same
-    title = article.get("title", "")
-    description = article.get("description", "")
+def _request_batch_scores(batch, company_name):
+    """One GPT round trip scoring every article in `batch` (a dict of id -> article)."""
+    lines = []
+    for art_id, art in batch.items():
+        lines.append(f"[{art_id}] Title: {art.get('title', '')}\nDescription: {art.get('description', '')}")
     prompt = (
-        f"You are a news classifier for an investor in '{company_name}'.\n\n"
-        f"News Article:\nTitle: {title}\nDescription: {description}\n\n"
-        "Task: Is this article directly relevant to '{company_name}'s business operations, financial performance, stock, or major partnerships/products? Answer 'YES' or 'NO'."
+        f"You are a financial news analyst for an investor in '{company_name}'.\n\n"
+        "News Articles:\n" + "\n\n".join(lines) + "\n\n"
+        "Task: For EVERY article above decide:\n"
+        f"- relevant: true if it is directly relevant to '{company_name}'s business operations, financial performance, stock, or major partnerships/products, else false.\n"
+        "- sentiment: a float between -1.0 (very negative) and 1.0 (very positive) from an investor's perspective.\n"
+        "Output a valid JSON object with a single key 'results' which contains an array of objects "
+        "with the keys 'id' (the id in square brackets, as a string), 'relevant' and 'sentiment'."
     )
-    try:
-        logging.info(f"[GPT] Relevance check for: '{title}'")
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini", messages=[{"role": "user", "content": prompt}], temperature=0,
-        )
-        answer = resp.choices[0].message.content.strip().upper()
-        logging.info(f"[GPT] Relevance answer: {answer}")
-        return "YES" in answer
-    except Exception as e:
-        logging.error(f"⚠️ relevance GPT error on {title!r}: {e}")
-    return False
+    logging.info(f"[GPT] Batch scoring {len(batch)} articles for {company_name!r}")
+    resp = chat_completion(
+        "score", response_format={"type": "json_object"},
+        messages=[{"role": "user", "content": prompt}], temperature=0,
+    )
+    return json.loads(resp.choices[0].message.content).get("results", [])
 
-def get_sentiment(article):
-    # This function remains the same
-    title, description = article.get("title", ""), article.get("description", "")
-    prompt = (
-        f"You are a financial news sentiment analyst.\nAnalyze the following news article:\n"
-        f"Title: {title}\nDescription: {description}\n\n"
-        "Task: Rate the sentiment from an investor's perspective. Return ONLY a single float between -1.0 (very negative) and 1.0 (very positive)."
+def _validate_batch_scores(results, batch):
+    """Keeps only well-formed results whose id belongs to `batch`."""
+    scores = {}
+    if not isinstance(results, list):
+        return scores
+    for row in results:
+        if not isinstance(row, dict):
+            continue
+        art_id = str(row.get("id", "")).strip("[] ")
+        relevant, sentiment = row.get("relevant"), row.get("sentiment")
+        if art_id not in batch or art_id in scores or not isinstance(relevant, bool):
+            continue
+        try:
+            sentiment = max(-1.0, min(1.0, float(sentiment)))
+        except (TypeError, ValueError):
+            continue
+        scores[art_id] = {"relevant": relevant, "sentiment": sentiment}
+    return scores
+
+def score_articles(articles, company_name):
+    """
+    Scores relevance and sentiment for all of a symbol's articles in batched GPT calls.
+    Articles are sent in chunks of LLM_BATCH_SIZE; ids missing from (or malformed in) a
+    response are retried on their own, up to LLM_BATCH_RETRIES times.
+    Articles already scored for this company (by any symbol or earlier refresh) come from `llm_cache`.
+    Returns (relevant, unscored): copies of the relevant articles, in input order, with a
+    'sentiment' key, and the articles no attempt managed to score.
+    """
+    unique, seen_urls = [], set()
+    for art in articles:
+        key = art.get("url") or art.get("title")
+        if key and key not in seen_urls:
+            seen_urls.add(key)
+            unique.append(art)
+
+    by_id = {str(i): art for i, art in enumerate(unique)}
+    cache_keys = {
+        art_id: article_key("score", LLM_MODEL, BATCH_SCORE_PROMPT_VERSION, art, company_name)
+        for art_id, art in by_id.items()
+    }
+    cached = llm_cache.get_many(cache_keys.values())
+    scores = {art_id: cached[key] for art_id, key in cache_keys.items() if key in cached}
+    if scores:
+        logging.info(f"[GPT cache] {len(scores)}/{len(by_id)} articles for {company_name!r} already scored")
+    pending = [art_id for art_id in by_id if art_id not in scores]
+    for attempt in range(LLM_BATCH_RETRIES + 1):
+        if not pending:
+            break
+        if attempt:
+            logging.info(f"[GPT] Retrying {len(pending)} unscored articles for {company_name!r} (attempt {attempt})")
+        for i in range(0, len(pending), LLM_BATCH_SIZE):
+            batch = {art_id: by_id[art_id] for art_id in pending[i:i + LLM_BATCH_SIZE]}
+            if attempt:
+                UPSTREAM_RETRIES.inc(upstream="openai")
+            try:
+                fresh = _validate_batch_scores(_request_batch_scores(batch, company_name), batch)
+                scores.update(fresh)
+                llm_cache.set_many({cache_keys[art_id]: score for art_id, score in fresh.items()})
+            except Exception as e:
+                logging.error(f"⚠️ batch scoring GPT error for {company_name!r}: {e}")
+        pending = [art_id for art_id in pending if art_id not in scores]
+
+    if pending:
+        logging.warning(f"[GPT] Giving up on {len(pending)} articles for {company_name!r}; leaving them for the next refresh")
+
+    scored = []
+    for art_id, art in by_id.items():
+        score = scores.get(art_id)
+        if score and score["relevant"]:
+            art_copy = art.copy()
+            art_copy['sentiment'] = score["sentiment"]
+            scored.append(art_copy)
+    return scored, [by_id[art_id] for art_id in pending]
+
+_headlines_cache = {"fetched_at": 0.0, "body": None, "etag": None}
+
+async def fetch_top_headlines():
+    """Fetches the general business headlines from Brave and caches the serialised JSON body."""
+    logging.info("Fetching general business news from Brave API for API endpoint...")
+    params = {"q": "India business finance market", "country": "in", "search_lang": "en", "count": 10}
+    top_headlines = []
+    for item in await brave_client.search_news(params):
+        top_headlines.append({
+            "title": item.get("title"),
+            "url": item.get("url"),
+            "source": {"name": item.get("source")},
+            "publishedAt": item.get("page_age")
+        })
+    logging.info(f"Successfully fetched {len(top_headlines)} general news articles for API.")
+    body = json.dumps(top_headlines).encode("utf-8")
+    _headlines_cache.update(
+        fetched_at=time.monotonic(), body=body, etag=f'"{hashlib.sha1(body).hexdigest()}"'
     )
+    return _headlines_cache
+
+def etag_matches(request, etag):
+    """True when the request's If-None-Match header already names `etag`."""
+    candidates = request.headers.get("if-none-match", "")
+    return any(c.strip().removeprefix("W/") in (etag, "*") for c in candidates.split(","))
+
+@app.get("/api/top-headlines", response_class=JSONResponse)
+async def api_top_headlines(request: Request):
+    """
+    API endpoint to fetch only the top headlines. Served from memory for HEADLINES_CACHE_SECONDS;
+    concurrent misses share one Brave call, and an upstream failure falls back to the last good copy.
+    """
+    cached = _headlines_cache
+    age = time.monotonic() - cached["fetched_at"]
+    if cached["body"] is None or age >= HEADLINES_CACHE_SECONDS:
+        CACHE_REQUESTS.inc(cache="headlines", result="miss")
+        try:
+            with timed("headlines.fetch"):
+                cached = await asyncio.shield(single_flight(("headlines",), fetch_top_headlines))
+            age = 0.0
+        except Exception as e:
+            logging.error(f"Error fetching general business news from Brave for API: {e}")
+            if cached["body"] is None:
+                return JSONResponse(content={"error": str(e)}, status_code=500)
+    else:
+        CACHE_REQUESTS.inc(cache="headlines", result="hit")
+
+    headers = {
+        "ETag": cached["etag"],
+        "Cache-Control": f"public, max-age={max(0, int(HEADLINES_CACHE_SECONDS - age))}",
+    }
+    if etag_matches(request, cached["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached["body"], media_type="application/json", headers=headers)
+
+def ticker_info(symbol):
+    import yfinance as yf
+
+    return yf.Ticker(f"{symbol}.NS").info
+
+def extract_fundamentals(info):
+    """Picks the valuation fields shown on a holding card out of a yfinance `.info` dict."""
+    return {"pe_ratio": info.get("trailingPE"), "eps": info.get("trailingEps"), "roce": info.get("returnOnEquity")}
+
+async def search_symbol_news(search_phrases, freshness=f"pd{NEWS_WINDOW_DAYS}"):
+    """Runs all of a symbol's search phrases concurrently and returns the URL-deduplicated articles."""
+    queries = [{"q": f'{phrase} -site:simplywall.st', "count": 5, "freshness": freshness} for phrase in search_phrases]
+    responses = await asyncio.gather(*(brave_client.search_news(params) for params in queries), return_exceptions=True)
+
+    failures = [r for r in responses if isinstance(r, BaseException)]
+    for params, r in zip(queries, responses):
+        if isinstance(r, BaseException):
+            logging.error(f"Brave search failed for {params['q']!r}: {r}")
+    if failures and len(failures) == len(responses):
+        raise BraveSearchError(f"All {len(failures)} Brave searches failed")
+
+    all_articles = []
+    seen_urls = set()
+    for results in responses:
+        if isinstance(results, BaseException):
+            continue
+        for item in results:
+            if item.get('url') and item['url'] not in seen_urls:
+                seen_urls.add(item['url'])
+                all_articles.append({
+                    "title": item.get("title"), "description": item.get("description"),
+                    "url": item.get("url"), "source": {"name": item.get("source")},
+                    "publishedAt": item.get("page_age")
+                })
+    return all_articles
+
+async def resolve_metadata(symbol):
+    """
+    Company name, sector, description, fundamentals, search phrases and aliases for `symbol`,
+    with manual overrides applied. Served from `metadata_store` while fresh; otherwise `.info`
+    is read again (keeping the stored record if yfinance fails) and phrases are generated for
+    records that have none and no override. Fundamentals expire after SYMBOL_FUNDAMENTALS_TTL_HOURS
+    and are then re-read on their own, leaving the rest of a fresh record (and its age) alone.
+    """
+    record, fresh = await asyncio.to_thread(metadata_store.get, symbol)
+    CACHE_REQUESTS.inc(cache="metadata", result="hit" if fresh else "stale" if record else "miss")
+    fundamentals_age = time.time() - (record or {}).get("fundamentals_at", 0)
+    changed = touched = False
+    if not fresh or fundamentals_age >= SYMBOL_FUNDAMENTALS_TTL_HOURS * 3600:
+        try:
+            with timed("yfinance.info", symbol):
+                info = await asyncio.to_thread(ticker_info, symbol)
+        except Exception as e:
+            UPSTREAM_ERRORS.inc(upstream="yfinance")
+            if record is None:
+                raise
+            logging.warning(f"[metadata] yfinance info failed for {symbol}; using stored metadata: {e!r}")
+        else:
+            if not fresh:
+                # Phrases are regenerated with the new info; unchanged info makes that an llm_cache hit.
+                record = {
+                    "name": info.get("longName", symbol), "sector": info.get("sector", ""),
+                    "description": info.get("longBusinessSummary", ""),
+                }
+                touched = True
+            record = {**record, "fundamentals": extract_fundamentals(info), "fundamentals_at": time.time()}
+            changed = True
+
+    meta = apply_overrides(record, symbol_overrides.get(symbol))
+    if not meta.get("phrases"):
+        with timed("phrases", symbol):
+            phrases = await asyncio.to_thread(expand_query_with_gpt, meta["name"], meta["sector"], meta["description"])
+        if phrases:
+            record["phrases"] = meta["phrases"] = phrases
+            changed = True
+    if changed:
+        await asyncio.to_thread(metadata_store.set, symbol, record, touched)
+    return meta
+
+def parse_page_age(value):
+    """A Brave `page_age` (naive values are UTC) as an aware datetime, or None if missing or malformed."""
     try:
-        logging.info(f"[GPT] Sentiment check for: '{title}'")
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini", messages=[{"role": "user", "content": prompt}], temperature=0,
+        ts = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts
+
+def search_freshness(watermark, now):
+    """Brave `freshness` for a refresh: the whole window, or only the days since the watermark."""
+    last = parse_page_age(watermark.get("page_age"))
+    if last is None or now - last >= timedelta(days=NEWS_WINDOW_DAYS):
+        return f"pd{NEWS_WINDOW_DAYS}"
+    # Brave ranges are whole days; starting a day early absorbs timezone skew, and the
+    # watermark's seen URLs drop whatever comes back twice.
+    return f"{(last - timedelta(days=1)).date().isoformat()}to{now.date().isoformat()}"
+
+async def refresh_news(symbol, previous=None):
+    """
+    Brings the scored article list for one symbol up to date. Company info and search phrases
+    come from the metadata tier, so a symbol with fresh metadata goes straight to searching.
+
+    With a `previous` entry, only articles published since its watermark are searched for, and
+    only URLs it hasn't seen are prefiltered and scored; they are merged with the previous
+    articles, and anything older than NEWS_WINDOW_DAYS is evicted. Articles GPT couldn't score
+    are not marked as seen, so the next refresh tries them again. A change of search phrases
+    starts over with a full-window search. GPT calls run in worker threads; the Brave searches
+    share the pooled async client.
+    Returns a cache entry holding the articles, the fundamentals from the metadata and the new watermark.
+    """
+    now = datetime.now(timezone.utc)
+    window_start = now - timedelta(days=NEWS_WINDOW_DAYS)
+    meta = await resolve_metadata(symbol)
+    name = meta["name"]
+    search_phrases = meta.get("phrases") or [f'"{name}"']
+
+    watermark = (previous or {}).get("watermark") or {}
+    if watermark.get("phrases") != search_phrases:
+        watermark = {}
+    # URLs are remembered (scored or not) until their article leaves the window.
+    seen = {
+        url: page_age for url, page_age in watermark.get("seen", {}).items()
+        if (parse_page_age(page_age) or now) >= window_start
+    }
+    retained = [a for a in (previous or {}).get("articles", []) if watermark and a.get("url") in seen]
+
+    with timed("brave.search", symbol):
+        all_articles = await search_symbol_news(search_phrases, freshness=search_freshness(watermark, now))
+    new_articles = [a for a in all_articles if a["url"] not in seen]
+    with timed("prefilter", symbol):
+        candidates, stats = await run_cpu_bound(
+            prefilter_articles, new_articles, name, symbol, meta["aliases"], known=retained
         )
-        score = float(resp.choices[0].message.content.strip())
-        logging.info(f"[GPT] Sentiment score: {score}")
-        return max(-1.0, min(1.0, score))
+    logging.info(
+        f"[prefilter] {symbol}: {len(all_articles)} articles, {len(all_articles) - len(new_articles)} already seen, "
+        f"{stats['near_duplicates']} near-duplicates removed, {stats['no_lexical_match']} without a name/ticker "
+        f"match removed, {stats['kept']} sent to GPT ({len(retained)} kept from earlier refreshes)"
+    )
+
+    with timed("score", symbol):
+        scored, unscored = await asyncio.to_thread(score_articles, candidates, name) if candidates else ([], [])
+    # Articles GPT couldn't score (e.g. during an OpenAI outage) stay unseen, and the watermark
+    # stays at or before the oldest of them, so the next refresh fetches and scores them again.
+    retry_urls = {art["url"] for art in unscored}
+    for art in all_articles:
+        if art["url"] not in retry_urls:
+            seen.setdefault(art["url"], art.get("publishedAt") or now.isoformat())
+    page_ages = [parse_page_age(art.get("publishedAt")) for art in all_articles if art["url"] not in retry_urls]
+    latest = max(filter(None, [*page_ages, parse_page_age(watermark.get("page_age"))]), default=None)
+    if unscored:
+        retry_ages = [parse_page_age(art.get("publishedAt")) for art in unscored]
+        # An unscored article without a usable date means searching the whole window again.
+        latest = None if None in retry_ages or latest is None else min(latest, *retry_ages)
+    return {
+        "timestamp": now.isoformat(),
+        "articles": [a for a in scored + retained if (parse_page_age(a.get("publishedAt")) or now) >= window_start],
+        "fundamentals": meta.get("fundamentals") or extract_fundamentals({}),
+        "watermark": {"page_age": latest.isoformat() if latest else None, "seen": seen, "phrases": search_phrases},
+    }
+
+def fetch_market_data(symbols):
+    """
+    Syncs the local price store (one multi-ticker request for the bars that are new since the
+    last sync) and reads last price, 1D-1Y changes and the 52-week range for all symbols from it.
+    Symbols yfinance has no data for map to None values instead of raising.
+    """
+    if not symbols:
+        return {}
+    try:
+        with timed("prices.sync"):
+            price_store.sync(symbols)
     except Exception as e:
-        logging.error(f"⚠️ sentiment GPT error on {title!r}: {e}")
-    return 0.0
+        # The store still holds the previous sync; serve from it rather than showing nothing.
+        UPSTREAM_ERRORS.inc(upstream="yfinance")
+        logging.error(f"Price store sync failed, using stored bars: {e!r}")
+    with timed("prices.summary"):
+        return price_store.summary(symbols)
 
-@app.get("/api/top-headlines", response_class=JSONResponse)
-async def api_top_headlines():
-    """API endpoint to fetch only the top headlines."""
-    top_headlines = []
+# --- Background Refresh ---
+_inflight = {}  # key -> asyncio.Task for work that concurrent callers should share
+_refresh_semaphore = asyncio.Semaphore(MAX_CONCURRENT_SYMBOLS)
+_scheduled = set()  # symbols the scheduler has queued but not started yet
+_delayed = set()  # _refresh_later tasks, so shutdown can cancel them
+
+def single_flight(key, factory):
+    """
+    Returns the running task for `key`, or starts `factory()` as a new one.
+    Callers should await it through asyncio.shield so one cancelled request can't cancel the others.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(factory())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return task
+
+async def _run_refresh(symbol):
+    async with _refresh_semaphore:
+        logging.info(f"Refreshing news for {symbol}")
+        try:
+            previous = (await news_store.get_many([symbol])).get(symbol)
+        except Exception as e:
+            logging.error(f"Could not read the cached news for {symbol}; refreshing from scratch: {e}")
+            previous = None
+        try:
+            with timed("refresh", symbol):
+                entry = await asyncio.wait_for(refresh_news(symbol, previous), SYMBOL_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logging.error(f"News refresh for {symbol} timed out after {SYMBOL_TIMEOUT_SECONDS}s")
+            return None
+        except Exception as e:
+            logging.error(f"Failed to fetch new data for {symbol}: {e}")
+            return None
     try:
-        logging.info("Fetching general business news from Brave API for API endpoint...")
-        headers = {"X-Subscription-Token": BRAVE_API_KEY, "Accept": "application/json"}
-        params = {"q": "India business finance market", "country": "in", "search_lang": "en", "count": 10}
-        
-        top_headlines_resp = requests.get(BRAVE_NEWS_ENDPOINT, headers=headers, params=params)
-        top_headlines_resp.raise_for_status()
-        
-        brave_results = top_headlines_resp.json().get("results", [])
-        for item in brave_results:
-            top_headlines.append({
-                "title": item.get("title"),
-                "url": item.get("url"),
-                "source": {"name": item.get("source")},
-                "publishedAt": item.get("page_age")
-            })
-        logging.info(f"Successfully fetched {len(top_headlines)} general news articles for API.")
+        with timed("news_cache.write", symbol):
+            await news_store.upsert(symbol, entry)
     except Exception as e:
-        logging.error(f"Error fetching general business news from Brave for API: {e}")
-        return JSONResponse(content={"error": str(e)}, status_code=500)
-    
-    return JSONResponse(content=top_headlines)
+        logging.error(f"Failed to store refreshed news for {symbol}: {e}")
+    return entry
 
+def refresh_symbol(symbol):
+    """Starts (or joins) the news refresh for `symbol`; resolves to the new cache entry or None."""
+    return single_flight(("news", symbol), lambda: _run_refresh(symbol))
 
-@app.get("/", response_class=HTMLResponse)
-async def homepage(request: Request):
-    cache = load_cache()
-    holdings = load_holdings()
+async def _refresh_later(symbol, delay):
+    try:
+        await asyncio.sleep(delay)
+        await refresh_symbol(symbol)
+    finally:
+        _scheduled.discard(symbol)
 
-    holdings_with_news = []
-    for h in holdings:
-        symbol = h.get("tradingsymbol", "").strip()
-        if not symbol: continue
-        logging.info(f"Processing {symbol}")
+async def refresh_scheduler():
+    """Refreshes symbols shortly before their cache entry expires, so page views never wait on a rebuild."""
+    refresh_after = timedelta(hours=CACHE_DURATION_HOURS) - timedelta(minutes=REFRESH_AHEAD_MINUTES)
+    while True:
+        try:
+            symbols = [h.get("tradingsymbol", "").strip() for h in load_holdings()]
+            symbols = [s for s in symbols if s and s not in _scheduled and ("news", s) not in _inflight]
+            cache = await news_store.get_many(symbols)
+            due = []
+            for symbol in symbols:
+                if symbol not in cache or cache_age(cache[symbol]) >= refresh_after:
+                    due.append(symbol)
+            if due:
+                logging.info(f"[scheduler] Queuing refresh for {len(due)} symbols: {', '.join(due)}")
+            spread = min(REFRESH_JITTER_SECONDS, REFRESH_INTERVAL_SECONDS)
+            for symbol in due:
+                _scheduled.add(symbol)
+                task = asyncio.create_task(_refresh_later(symbol, random.uniform(0, spread)))
+                _delayed.add(task)
+                task.add_done_callback(_delayed.discard)
+        except Exception as e:
+            logging.error(f"[scheduler] Refresh pass failed: {e}")
+        await asyncio.sleep(REFRESH_INTERVAL_SECONDS * random.uniform(0.8, 1.2))
 
-        is_cache_fresh = False
-        if symbol in cache:
-            cached_at = datetime.fromisoformat(cache[symbol]['timestamp'])
-            if datetime.now() - cached_at < timedelta(hours=CACHE_DURATION_HOURS):
-                is_cache_fresh = True
+async def cancel_background_tasks(*tasks):
+    """Cancels `tasks`, the queued refreshes and every in-flight task, and waits for them to finish."""
+    tasks = {t for t in (*tasks, *_delayed, *_inflight.values()) if t is not None}
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
 
-        if is_cache_fresh:
-            logging.info(f"Using fresh cache for {symbol}")
-            articles_with_sentiment = cache[symbol]['articles']
-        else:
-            logging.info(f"Cache stale or not found for {symbol}. Fetching new data.")
+def average_sentiment(articles):
+    scores = [a["sentiment"] for a in articles or () if isinstance(a.get("sentiment"), (int, float))]
+    return round(sum(scores) / len(scores), 3) if scores else None
+
+async def process_holding(h, cache, wait=True):
+    """
+    Resolves the articles and fundamentals for one holding without waiting on a rebuild:
+    stale entries are served as-is (marked `stale`) while a shared refresh runs in the background.
+    Only symbols with no cached entry at all wait for their first refresh, and with `wait=False`
+    not even those: their refresh starts and the card comes back empty and `stale`.
+    """
+    symbol = h.get("tradingsymbol", "").strip()
+    entry = cache.get(symbol)
+    if entry is None and not wait:
+        CACHE_REQUESTS.inc(cache="news", result="miss")
+        refresh_symbol(symbol)
+    elif entry is None:
+        CACHE_REQUESTS.inc(cache="news", result="miss")
+        logging.info(f"No cached news for {symbol}. Waiting for the first refresh.")
+        with timed("first_refresh_wait", symbol):
+            entry = await asyncio.shield(refresh_symbol(symbol))
+    elif not is_entry_fresh(entry) or entry.get("fundamentals") is None:
+        CACHE_REQUESTS.inc(cache="news", result="stale")
+        logging.info(f"Serving stale cache for {symbol}; refreshing in the background.")
+        refresh_symbol(symbol)
+    else:
+        CACHE_REQUESTS.inc(cache="news", result="hit")
+        logging.info(f"Using fresh cache for {symbol}")
+
+    entry = entry or {}
+    return {
+        "symbol": symbol, "quantity": h.get("quantity"), "avg_price": h.get("average_price"),
+        **(entry.get("fundamentals") or extract_fundamentals({})),
+        "articles": entry.get("articles", []),
+        "sentiment": average_sentiment(entry.get("articles")),
+        "stale": not entry or not is_entry_fresh(entry),
+    }
+
+_market_snapshot = {"symbols": frozenset(), "fetched_at": 0.0, "data": {}}
+
+async def get_market_data(symbols, max_age=MARKET_CACHE_SECONDS):
+    """
+    Bulk market data for `symbols`, reusing the last download for `max_age` seconds.
+    Concurrent page views share one download, and summaries another worker (or another
+    user's page view) stored within that window are read from `market_store` instead of
+    downloaded again. Failures fall back to the last snapshot.
+    """
+    wanted = frozenset(symbols)
+    snapshot = _market_snapshot
+    if wanted <= snapshot["symbols"] and time.monotonic() - snapshot["fetched_at"] < max_age:
+        CACHE_REQUESTS.inc(cache="market", result="hit")
+        return snapshot["data"]
+    CACHE_REQUESTS.inc(cache="market", result="miss")
+
+    async def download():
+        try:
+            with timed("market_store.read"):
+                data = await market_store.get_many(wanted, max_age)
+        except Exception as e:
+            logging.error(f"Shared market snapshot read failed: {e!r}")
+            data = {}
+        missing = wanted - data.keys()
+        CACHE_REQUESTS.inc(len(data), cache="market_store", result="hit")
+        CACHE_REQUESTS.inc(len(missing), cache="market_store", result="miss")
+        if missing:
+            fresh = await asyncio.wait_for(asyncio.to_thread(fetch_market_data, sorted(missing)), SYMBOL_TIMEOUT_SECONDS)
+            data.update(fresh)
             try:
-                info = yf.Ticker(f"{symbol}.NS").info
-                name, sector, desc = info.get("longName", symbol), info.get("sector", ""), info.get("longBusinessSummary", "")
-                search_phrases = expand_query_with_gpt(name, sector, desc)
-                if not search_phrases: search_phrases = [f'"{name}"']
-
-                all_articles = []
-                seen_urls = set()
-                headers = {"X-Subscription-Token": BRAVE_API_KEY, "Accept": "application/json"}
-                for phrase in search_phrases:
-                    query = f'{phrase} -site:simplywall.st'
-                    params = {"q": query, "count": 5, "freshness": "pd7"}
-                    resp = requests.get(BRAVE_NEWS_ENDPOINT, headers=headers, params=params)
-                    resp.raise_for_status()
-                    for item in resp.json().get("results", []):
-                        if item.get('url') and item['url'] not in seen_urls:
-                            seen_urls.add(item['url'])
-                            all_articles.append({
-                                "title": item.get("title"), "description": item.get("description"),
-                                "url": item.get("url"), "source": {"name": item.get("source")},
-                                "publishedAt": item.get("page_age")
-                            })
-                
-                articles_with_sentiment = []
-                for art in all_articles:
-                    if is_article_relevant(art, name):
-                        art_copy = art.copy()
-                        art_copy['sentiment'] = get_sentiment(art)
-                        articles_with_sentiment.append(art_copy)
-                
-                cache[symbol] = {
-                    "timestamp": datetime.now().isoformat(),
-                    "articles": articles_with_sentiment
-                }
+                with timed("market_store.write"):
+                    await market_store.upsert_many({s: v for s, v in fresh.items() if v.get("last_price") is not None})
             except Exception as e:
-                logging.error(f"Failed to fetch new data for {symbol}: {e}")
-                articles_with_sentiment = cache.get(symbol, {}).get('articles', [])
+                logging.error(f"Shared market snapshot write failed: {e!r}")
+        _market_snapshot.update(symbols=wanted, fetched_at=time.monotonic(), data=data)
+        return data
 
+    try:
+        return await asyncio.shield(single_flight(("market", wanted), download))
+    except Exception as e:
+        logging.error(f"Bulk yfinance price download failed: {e!r}")
+        return snapshot["data"]
+
+async def read_news_cache(symbols):
+    """Cached news entries for `symbols`; a failed read counts as an empty cache instead of failing the page."""
+    try:
+        return await news_store.get_many(symbols)
+    except Exception as e:
+        logging.error(f"News cache read failed: {e!r}")
+        return {}
+
+def with_market_data(card, market_data):
+    card.update(market_data.get(card["symbol"]) or dict.fromkeys(MARKET_FIELDS))
+    return card
+
+async def stream_cards(holdings, cache, market_data, slots):
+    """Yields (slot, card) for holdings with no cached entry as each one's first refresh finishes."""
+    async def build(slot, h):
         try:
-            info = yf.Ticker(f"{symbol}.NS").info
-            hist = yf.Ticker(f"{symbol}.NS").history(period="1mo")
-            
-            last_price = hist["Close"].iloc[-1] if not hist.empty else None
-            prev_close = hist["Close"].iloc[-2] if len(hist) > 1 else last_price
-            week_ago = hist["Close"].iloc[-5] if len(hist) >= 5 else hist["Close"].iloc[0] if not hist.empty else None
-            month_ago = hist["Close"].iloc[0] if not hist.empty else None
-
-            day_change_pct = ((last_price - prev_close) / prev_close * 100) if last_price and prev_close else None
-            week_change_pct = ((last_price - week_ago) / week_ago * 100) if last_price and week_ago and week_ago != 0 else None
-            month_change_pct = ((last_price - month_ago) / month_ago * 100) if last_price and month_ago and month_ago != 0 else None
-            
-            pe_ratio = info.get("trailingPE")
-            eps = info.get("trailingEps")
-            roce = info.get("returnOnEquity")
-
-            holdings_with_news.append({
-                "symbol": symbol, "quantity": h.get("quantity"), "avg_price": h.get("average_price"),
-                "last_price": last_price, "pe_ratio": pe_ratio, "eps": eps, "roce": roce,
-                "day_change_pct": day_change_pct, "week_change_pct": week_change_pct, "month_change_pct": month_change_pct,
-                "articles": articles_with_sentiment
-            })
+            return slot, with_market_data(await process_holding(h, cache), market_data)
         except Exception as e:
-            logging.error(f"Failed to process yfinance data for {symbol}: {e}")
-            
-    save_cache(cache)
-    return templates.TemplateResponse("holdings.html", {"request": request, "top_headlines": [], "data": holdings_with_news})
+            logging.error(f"Unexpected error while processing {h.get('tradingsymbol')}: {e}")
+            return slot, None
+
+    for next_card in asyncio.as_completed([build(slot, h) for slot, h in zip(slots, holdings)]):
+        yield await next_card
+
+@app.get("/", response_class=HTMLResponse)
+async def homepage(request: Request, stream: bool = STREAM_HOLDINGS):
+    """
+    The dashboard. Portfolios larger than HOLDINGS_PAGE_SIZE render only their first page of
+    cards, without article lists; the page loads further cards from /holdings/cards and each
+    card's articles from /api/holdings as they scroll into view.
+    """
+    with timed("holdings.load"):
+        holdings = [h for h in load_holdings() if h.get("tradingsymbol", "").strip()]
+    all_symbols = [h["tradingsymbol"].strip() for h in holdings]
+    lazy = len(holdings) > HOLDINGS_PAGE_SIZE
+    next_cursor = encode_cursor(HOLDINGS_PAGE_SIZE, "position", "asc") if lazy else None
+    holdings = holdings[:HOLDINGS_PAGE_SIZE] if lazy else holdings
+    symbols = all_symbols[:len(holdings)]
+    # Prices for the whole portfolio in one go, so the lazily loaded pages find them in the snapshot.
+    cache, market_data = await asyncio.gather(
+        timed_await("news_cache.read", read_news_cache(symbols)),
+        timed_await("market_data", get_market_data(all_symbols)),
+    )
+    context = {
+        "request": request, "top_headlines": [], "lazy_articles": lazy, "next_cursor": next_cursor,
+        "live_prices": LIVE_PRICES_ENABLED,
+    }
+
+    if not stream:
+        results = await asyncio.gather(*(process_holding(h, cache) for h in holdings), return_exceptions=True)
+        holdings_with_news = []
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, BaseException):
+                logging.error(f"Unexpected error while processing {symbol}: {result}")
+                continue
+            holdings_with_news.append(with_market_data(result, market_data))
+        with timed("render"):
+            return templates.TemplateResponse("holdings.html", {**context, "data": holdings_with_news})
+
+    # Streaming mode: the shell goes out with every cached card (fresh or stale) and a placeholder
+    # for each symbol still waiting on its first refresh; those cards follow as they complete.
+    data, pending, slots = [], [], []
+    for slot, (symbol, h) in enumerate(zip(symbols, holdings)):
+        if symbol in cache:
+            data.append(with_market_data(await process_holding(h, cache), market_data))
+        else:
+            data.append({"symbol": symbol, "pending": True})
+            pending.append(h)
+            slots.append(slot)
+
+    with timed("render"):
+        shell = templates.get_template("holdings.html").render({**context, "data": data})
+    head, tail = shell.rsplit("</body>", 1)
+    card_template = templates.get_template("_holding_card.html")
+
+    async def body():
+        # Runs after the headers have gone out, so it shows up in /metrics but not in Server-Timing.
+        with timed("stream_cards"):
+            yield head
+            async for slot, card in stream_cards(pending, cache, market_data, slots):
+                if card is None:
+                    yield f'<script>document.getElementById("pending-{slot}")?.remove()</script>'
+                    continue
+                card_html = card_template.render(holding=card, lazy_articles=lazy)
+                yield f'<template id="card-tpl-{slot}">{card_html}</template><script>fillCard({slot})</script>'
+            yield "</body>" + tail
+
+    return StreamingResponse(body(), media_type="text/html")
+
+# --- Holdings API ---
+HOLDING_FIELDS = (
+    "symbol", "quantity", "avg_price", "pe_ratio", "eps", "roce", *MARKET_FIELDS, "sentiment", "stale", "articles",
+)
+HOLDING_SORTS = ("position", "symbol", "quantity", "avg_price", "pe_ratio", "eps", "roce", *MARKET_FIELDS, "sentiment")
+NEWS_SORTS = {"pe_ratio", "eps", "roce", "sentiment"}  # Orderings that need every holding's news entry
+
+def encode_cursor(offset, sort, order):
+    """Opaque cursor for the page starting at `offset` of the given ordering."""
+    raw = json.dumps([offset, sort, order]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor, sort, order):
+    """The offset a cursor points at; ValueError if it is malformed or belongs to another ordering."""
+    try:
+        offset, cursor_sort, cursor_order = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor") from None
+    if (cursor_sort, cursor_order) != (sort, order) or not isinstance(offset, int) or offset < 0:
+        raise ValueError("Cursor was issued for a different sort order")
+    return offset
+
+def parse_list(value):
+    return [v.strip() for v in value.split(",") if v.strip()] if value else []
+
+def to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def holding_sort_value(sort, position, h, market, entry):
+    if sort == "position":
+        return position
+    if sort == "symbol":
+        return h["tradingsymbol"].strip()
+    if sort in ("quantity", "avg_price"):
+        return to_number(h.get("average_price" if sort == "avg_price" else sort))
+    if sort in MARKET_FIELDS:
+        return to_number((market or {}).get(sort))
+    if sort == "sentiment":
+        return average_sentiment((entry or {}).get("articles"))
+    return to_number(((entry or {}).get("fundamentals") or {}).get(sort))
+
+async def holdings_page(sort="position", order="asc", cursor=None, limit=HOLDINGS_PAGE_SIZE, symbols=None):
+    """
+    One page of holding cards in the requested order, plus the cursor of the next page (None on
+    the last) and the number of holdings. Holdings without a value for the sort field go last.
+    News entries are read for the page only, unless the ordering itself depends on them, and
+    symbols with no entry yet don't hold the page up (see `process_holding(wait=False)`).
+    """
+    offset = decode_cursor(cursor, sort, order) if cursor else 0
+    with timed("holdings.load"):
+        holdings = [h for h in load_holdings() if h.get("tradingsymbol", "").strip()]
+    if symbols:
+        holdings = [h for h in holdings if h["tradingsymbol"].strip() in symbols]
+    all_symbols = [h["tradingsymbol"].strip() for h in holdings]
+    market_data = await timed_await("market_data", get_market_data(all_symbols))
+    cache = await timed_await("news_cache.read", read_news_cache(all_symbols)) if sort in NEWS_SORTS else None
+
+    keyed = [
+        (holding_sort_value(sort, i, h, market_data.get(s), (cache or {}).get(s)), h)
+        for i, (s, h) in enumerate(zip(all_symbols, holdings))
+    ]
+    # sorted() is stable, also in reverse, so ties keep their portfolio order.
+    ordered = sorted((k for k in keyed if k[0] is not None), key=lambda k: k[0], reverse=order == "desc")
+    ordered = [h for _, h in ordered] + [h for value, h in keyed if value is None]
+
+    page = ordered[offset:offset + limit]
+    if cache is None:
+        cache = await timed_await("news_cache.read", read_news_cache([h["tradingsymbol"].strip() for h in page]))
+    cards = [with_market_data(await process_holding(h, cache, wait=False), market_data) for h in page]
+    more = offset + limit < len(ordered)
+    return {
+        "holdings": cards,
+        "next_cursor": encode_cursor(offset + limit, sort, order) if more else None,
+        "total": len(ordered),
+    }
+
+def conditional_response(request, body, media_type, headers=None):
+    """`body` with a content-hash ETag, or an empty 304 when the request's If-None-Match already names it."""
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", **(headers or {})}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+def check_holdings_query(sort, order, fields=()):
+    if sort not in HOLDING_SORTS:
+        raise ValueError(f"Unknown sort field {sort!r}; expected one of {', '.join(HOLDING_SORTS)}")
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be 'asc' or 'desc'")
+    unknown = [f for f in fields if f not in HOLDING_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields {', '.join(unknown)}; expected some of {', '.join(HOLDING_FIELDS)}")
+
+@app.get("/api/holdings", response_class=JSONResponse)
+async def api_holdings(
+    request: Request, cursor: str = None, limit: int = HOLDINGS_PAGE_SIZE, sort: str = "position",
+    order: str = "asc", fields: str = None, symbols: str = None,
+):
+    """
+    Holdings as JSON, a page at a time: `?sort=day_change_pct&order=desc&limit=50`, then
+    `?cursor=<next_cursor>` with the same sort and order until `next_cursor` is null.
+    `fields=symbol,last_price,sentiment` trims each holding to those fields (symbol is always
+    included) and `symbols=A,B` restricts the list to those holdings. Responses carry an ETag,
+    so polling clients get a 304 while nothing has changed.
+    """
+    wanted = parse_list(fields)
+    try:
+        check_holdings_query(sort, order, wanted)
+        page = await holdings_page(
+            sort, order, cursor, max(1, min(limit, HOLDINGS_MAX_PAGE_SIZE)), set(parse_list(symbols)) or None
+        )
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    if wanted:
+        keep = ["symbol", *(f for f in wanted if f != "symbol")]
+        page["holdings"] = [{f: card.get(f) for f in keep} for card in page["holdings"]]
+    else:
+        page["holdings"] = [{f: card.get(f) for f in HOLDING_FIELDS} for card in page["holdings"]]
+    return conditional_response(request, json.dumps(page).encode("utf-8"), "application/json")
+
+@app.get("/holdings/cards", response_class=HTMLResponse)
+async def holdings_cards(request: Request, cursor: str = None, sort: str = "position", order: str = "asc"):
+    """
+    The next page of dashboard cards as an HTML fragment, for the page's lazy loading. The cursor
+    of the page after it comes back in the X-Next-Cursor header (absent on the last page).
+    """
+    try:
+        check_holdings_query(sort, order)
+        page = await holdings_page(sort, order, cursor)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    card_template = templates.get_template("_holding_card.html")
+    with timed("render"):
+        html = "".join(card_template.render(holding=card, lazy_articles=True) for card in page["holdings"])
+    headers = {"X-Next-Cursor": page["next_cursor"]} if page["next_cursor"] else None
+    return conditional_response(request, html.encode("utf-8"), "text/html", headers)
+
+# --- Live Prices ---
+def holding_positions():
+    """{symbol: (quantity, average price)} for every holding."""
+    return {
+        h["tradingsymbol"].strip(): (to_number(h.get("quantity")), to_number(h.get("average_price")))
+        for h in load_holdings() if h.get("tradingsymbol", "").strip()
+    }
+
+async def fetch_live_quotes(symbols):
+    # The poll refreshes the shared snapshot, so page loads in between reuse it.
+    return await get_market_data(symbols, max_age=LIVE_PRICES_INTERVAL_SECONDS)
+
+price_hub = PriceHub(fetch_live_quotes, holding_positions, LIVE_PRICES_INTERVAL_SECONDS)
+
+@app.get("/api/prices/stream")
+async def prices_stream():
+    """
+    Server-sent `prices` events for the dashboard: each carries the holdings whose price moved
+    (last price, 1D change, value, P&L, day P&L; null for a holding that was sold) and the
+    portfolio totals. The first event has every holding the hub knows about.
+    """
+    if not LIVE_PRICES_ENABLED:
+        return JSONResponse(content={"error": "Live prices are disabled"}, status_code=404)
+
+    async def events():
+        async for message in price_hub.stream(LIVE_PRICES_KEEPALIVE_SECONDS):
+            if message is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: prices\ndata: {json.dumps(message)}\n\n"
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# --- Prewarm ---
+async def _run_prewarm():
+    from prewarm import prewarm_caches
+
+    try:
+        return await prewarm_caches()
+    except Exception as e:
+        logging.error(f"[prewarm] Failed: {e!r}")
+
+def start_prewarm():
+    """Starts (or joins) a prewarm of every holding's price, news and metadata caches."""
+    return single_flight(("prewarm",), _run_prewarm)
+
+@app.post("/api/prewarm", status_code=202)
+async def api_prewarm(request: Request):
+    """Starts a prewarm in the background; used by the scheduled `prewarm.py --url` job."""
+    if not PREWARM_TOKEN:
+        return JSONResponse(content={"error": "Prewarming over HTTP is disabled"}, status_code=404)
+    if not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {PREWARM_TOKEN}"):
+        return JSONResponse(content={"error": "Invalid token"}, status_code=401)
+    start_prewarm()
+    return JSONResponse(content={"status": "started"}, status_code=202)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage latencies, cache hit/miss counts, upstream errors/retries and OpenAI token usage for Prometheus."""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
 
 if __name__ == "__main__":
     import uvicorn
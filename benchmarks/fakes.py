@@ -0,0 +1,290 @@
+# benchmarks/fakes.py
+"""
+Local stand-ins for every upstream the dashboard talks to, so benchmarks cost no API quota.
+
+- Brave News Search and OpenAI chat completions are real HTTP servers (aiohttp) that the app
+  reaches through BRAVE_NEWS_ENDPOINT and OPENAI_BASE_URL.
+- The Kite MCP server is a fastmcp SSE server that main.py reaches through KITE_MCP_URL.
+- yfinance has no endpoint setting, so `patch_yfinance` swaps `yf.Ticker` and `yf.download`
+  in-process for functions that sleep for the configured latency and return synthetic data.
+
+All servers run on one event loop in a background thread, so they don't compete with the app
+under test for its loop. Every fake counts its calls in `FakeUpstreams.calls`.
+"""
+import asyncio
+import json
+import random
+import re
+import socket
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+from aiohttp import web
+
+WORDS = (
+    "quarterly results profit revenue order win expansion plant capacity acquisition stake board "
+    "dividend guidance margin demand exports rating upgrade downgrade target launch contract "
+    "approval regulator merger debt funding investment growth outlook shares rally slump"
+).split()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class FakeUpstreams:
+    def __init__(self, latency_ms=50, error_rate=0.0, articles=5, description_chars=200, seed=0):
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.articles = articles
+        self.description_chars = description_chars
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self.holdings = []  # Rows the fake Kite server returns from get_holdings
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._runners = []
+        self.brave_port, self.openai_port, self.kite_port = free_port(), free_port(), free_port()
+
+    @property
+    def brave_endpoint(self):
+        return f"http://127.0.0.1:{self.brave_port}/res/v1/news/search"
+
+    @property
+    def openai_base_url(self):
+        return f"http://127.0.0.1:{self.openai_port}/v1"
+
+    @property
+    def kite_url(self):
+        return f"http://127.0.0.1:{self.kite_port}/sse"
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.calls[name] += n
+
+    def reset_counts(self):
+        with self._lock:
+            self.calls.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.calls)
+
+    def should_fail(self):
+        with self._lock:
+            return self.random.random() < self.error_rate
+
+    def _words(self, seed, n_chars):
+        rng = random.Random(seed)
+        words, length = [], 0
+        while length < n_chars:
+            word = rng.choice(WORDS)
+            words.append(word)
+            length += len(word) + 1
+        return " ".join(words)
+
+    # --- Brave ---
+    async def brave_search(self, request):
+        await asyncio.sleep(self.latency)
+        if self.should_fail():
+            self.count("brave_errors")
+            return web.json_response({"error": "injected"}, status=503)
+        self.count("brave")
+        query = request.query.get("q", "").split(" -site:")[0].strip('"')
+        count = min(int(request.query.get("count", "5")), self.articles)
+        published = datetime.now(timezone.utc).isoformat()
+        results = [
+            {
+                # Distinct word mixes so the near-duplicate filter keeps them apart.
+                "title": f"{query}: {self._words(f'{query}|{i}|title', 40)}",
+                "description": self._words(f"{query}|{i}|description", self.description_chars),
+                "url": f"https://news.example/{zlib.crc32(query.encode())}/{i}",
+                "source": "Example News",
+                "page_age": published,
+            }
+            for i in range(count)
+        ]
+        return web.json_response({"results": results})
+
+    # --- OpenAI ---
+    def _completion(self, prompt):
+        if "'phrases'" in prompt:
+            company = re.search(r'Company: "(.+?)"', prompt).group(1)
+            return json.dumps({"phrases": [company, f"{company} quarterly results", f"{company} order win"]})
+        if "'results'" in prompt:
+            ids = re.findall(r"^\[(\d+)\]", prompt, flags=re.MULTILINE)
+            return json.dumps({"results": [
+                {"id": art_id, "relevant": int(art_id) % 3 != 2, "sentiment": round(self.random.uniform(-1, 1), 2)}
+                for art_id in ids
+            ]})
+        if "Answer 'YES' or 'NO'" in prompt:
+            return "YES"
+        return "0.1"
+
+    async def chat_completions(self, request):
+        await asyncio.sleep(self.latency)
+        if self.should_fail():
+            self.count("openai_errors")
+            return web.json_response({"error": {"message": "injected", "type": "server_error"}}, status=500)
+        self.count("openai")
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        content = self._completion(prompt)
+        prompt_tokens, completion_tokens = len(prompt) // 4, len(content) // 4
+        return web.json_response({
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {
+                "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+    # --- Kite MCP ---
+    def _kite_server(self):
+        from fastmcp import FastMCP
+
+        mcp = FastMCP("fake-kite")
+        session = {"logged_in": False}
+
+        async def call(name, payload):
+            await asyncio.sleep(self.latency)
+            self.count(f"kite.{name}")
+            return json.dumps(payload)
+
+        @mcp.tool()
+        def login() -> str:
+            self.count("kite.login")
+            session["logged_in"] = True  # The benchmark "completes" the browser login immediately
+            return "[Login to Kite](https://kite.zerodha.com/connect/login?api_key=kitemcp&bench=1)"
+
+        @mcp.tool()
+        async def get_profile() -> str:
+            if not session["logged_in"]:
+                return "Please log in first"
+            return await call("get_profile", {"user_id": "BENCH"})
+
+        @mcp.tool()
+        async def get_holdings() -> str:
+            return await call("get_holdings", self.holdings)
+
+        @mcp.tool()
+        async def get_positions() -> str:
+            return await call("get_positions", {"net": [], "day": []})
+
+        @mcp.tool()
+        async def get_margins() -> str:
+            return await call("get_margins", {"equity": {"net": 100000.0}})
+
+        @mcp.tool()
+        async def get_quotes(instruments: list[str]) -> str:
+            return await call("get_quotes", {i: {"last_price": 100.0} for i in instruments})
+
+        import uvicorn
+
+        return uvicorn.Server(uvicorn.Config(mcp.sse_app(), host="127.0.0.1", port=self.kite_port, log_level="warning"))
+
+    # --- Lifecycle ---
+    async def _serve(self, started):
+        for port, routes in (
+            (self.brave_port, [web.get("/res/v1/news/search", self.brave_search)]),
+            (self.openai_port, [web.post("/v1/chat/completions", self.chat_completions)]),
+        ):
+            app = web.Application()
+            app.add_routes(routes)
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, "127.0.0.1", port).start()
+            self._runners.append(runner)
+        self._kite = self._kite_server()
+        self._kite_task = asyncio.create_task(self._kite.serve())
+        started.set()
+
+    def start(self):
+        started = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.create_task(self._serve(started))
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="fake-upstreams", daemon=True)
+        self._thread.start()
+        started.wait(10)
+        wait_for_port(self.kite_port)
+        return self
+
+    async def _shutdown(self):
+        self._kite.should_exit = True
+        await self._kite_task
+        for runner in self._runners:
+            await runner.cleanup()
+
+    def stop(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(10)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+
+
+def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"Nothing is listening on port {port}")
+
+
+def patch_yfinance(upstreams):
+    """Replaces yfinance's Ticker and download with local fakes (counted in `upstreams.calls`)."""
+    import numpy as np
+    import pandas as pd
+    import yfinance as yf
+
+    class FakeTicker:
+        def __init__(self, ticker):
+            self.ticker = ticker
+
+        @property
+        def info(self):
+            time.sleep(upstreams.latency)
+            upstreams.count("yf_info")
+            symbol = self.ticker.removesuffix(".NS")
+            return {
+                "longName": f"{symbol} Industries Limited", "sector": "Industrials",
+                "longBusinessSummary": f"{symbol} makes things.",
+                "trailingPE": 20.5, "trailingEps": 12.3, "returnOnEquity": 0.15,
+            }
+
+    def fake_download(tickers, start=None, end=None, period=None, **kwargs):
+        time.sleep(upstreams.latency)
+        upstreams.count("yf_download")
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        last = date.today()
+        first = date.fromisoformat(start) if start else last - timedelta(days=365)
+        index = pd.bdate_range(first, last)
+        index = index[index.map(date.toordinal) % 20 != 0]  # Exchange holidays: ~248 sessions a year, like the NSE
+        rng = np.random.default_rng(len(tickers))
+        columns = {}
+        for ticker in tickers:
+            close = 100 * np.cumprod(1 + rng.normal(0, 0.01, len(index)))
+            for field, values in (
+                ("Open", close), ("High", close * 1.01), ("Low", close * 0.99),
+                ("Close", close), ("Adj Close", close), ("Volume", np.full(len(index), 1e5)),
+            ):
+                columns[(field, ticker)] = values
+        return pd.DataFrame(columns, index=index)
+
+    yf.Ticker = FakeTicker
+    yf.download = fake_download
@@ -0,0 +1,276 @@
+# benchmarks/run.py
+"""
+Offline benchmark for the dashboard and the Kite sync.
+
+Starts the local stand-ins from fakes.py, points the app at them through its environment
+settings, and for each portfolio size runs:
+
+- kite_sync:  main.main() against the fake Kite MCP server, which also seeds the holdings store
+- cold_page:  GET / with empty news/LLM caches (every symbol waits on its first refresh)
+- warm_page:  GET / again, served from the caches
+- headlines:  two GETs of /api/top-headlines starting from an empty headlines cache
+
+Each phase records latency (time to first byte and total), the number of calls each fake
+upstream received, and peak traced Python memory. The app's import time and the background
+preload of its heavy dependencies are reported separately under "startup" (yfinance is already
+loaded by then, for the fakes). Results are written as JSON; `--check`
+compares them with a saved baseline and exits non-zero when a phase makes more upstream calls
+than the baseline, or is slower by more than `--tolerance`.
+
+    python benchmarks/run.py --sizes 5,50,500 --output results.json
+    python benchmarks/run.py --sizes 5,50 --check benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import FakeUpstreams, free_port, patch_yfinance  # noqa: E402
+
+PHASES = ("kite_sync", "cold_page", "warm_page", "headlines")
+LATENCY_SLACK_MS = 50  # Absolute allowance on top of --tolerance, so tiny timings don't flap
+
+
+def configure_environment(upstreams, workdir):
+    """Points every upstream and local store at the fakes and a scratch directory (before the app is imported)."""
+    os.environ.pop("DATABASE_URL", None)  # Use the SQLite news store
+    os.environ.update({
+        "BRAVE_API_KEY": "bench",
+        "BRAVE_NEWS_ENDPOINT": upstreams.brave_endpoint,
+        "BRAVE_RATE_PER_SECOND": "1000",
+        "BRAVE_BURST": "100",
+        "BRAVE_BACKOFF_SECONDS": "0.05",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": upstreams.openai_base_url,
+        "KITE_MCP_URL": upstreams.kite_url,
+        "REFRESH_SCHEDULER_ENABLED": "0",
+        "NEWS_DB_PATH": os.path.join(workdir, "news_cache.db"),
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.db"),
+        "PRICE_STORE_DIR": os.path.join(workdir, "price_store"),
+        "HOLDINGS_DB_PATH": os.path.join(workdir, "holdings.db"),
+    })
+
+
+class Phase:
+    """Collects latency, upstream call counts and peak traced memory for one benchmark phase."""
+
+    def __init__(self, upstreams, trace_memory):
+        self.upstreams = upstreams
+        self.trace_memory = trace_memory
+        self.result = {}
+
+    def __enter__(self):
+        self.upstreams.reset_counts()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.result.setdefault("total_ms", round((time.perf_counter() - self.start) * 1000, 1))
+        self.result["calls"] = dict(sorted(self.upstreams.snapshot().items()))
+        if self.trace_memory:
+            self.result["peak_mem_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+        return False
+
+
+async def timed_get(session, url, phase=None):
+    """GETs `url`, reading the body as it streams; records status, bytes, ttfb_ms and total_ms."""
+    start = time.perf_counter()
+    ttfb, size = None, 0
+    async with session.get(url) as resp:
+        async for chunk in resp.content.iter_any():
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+            size += len(chunk)
+        status = resp.status
+    total = time.perf_counter() - start
+    result = {
+        "status": status, "bytes": size,
+        "ttfb_ms": round((ttfb if ttfb is not None else total) * 1000, 1), "total_ms": round(total * 1000, 1),
+    }
+    if phase is not None:
+        phase.result.update(result)
+    return result
+
+
+def holdings_for(size):
+    return [
+        {
+            "tradingsymbol": f"B{size}N{i:03d}", "exchange": "NSE", "isin": f"INEBENCH{i:04d}",
+            "quantity": 10, "t1_quantity": 0, "average_price": 100.0,
+        }
+        for i in range(size)
+    ]
+
+
+async def run_scenario(size, upstreams, session, base_url, trace_memory):
+    import app
+    import main
+
+    upstreams.holdings = holdings_for(size)
+    scenario = {"holdings": size}
+
+    with Phase(upstreams, trace_memory) as phase, contextlib.redirect_stdout(io.StringIO()):
+        await main.main()
+    scenario["kite_sync"] = phase.result
+
+    with Phase(upstreams, trace_memory) as phase:
+        await timed_get(session, f"{base_url}/?stream=true", phase)
+    scenario["cold_page"] = phase.result
+
+    with Phase(upstreams, trace_memory) as phase:
+        await timed_get(session, f"{base_url}/?stream=true", phase)
+    scenario["warm_page"] = phase.result
+
+    app._headlines_cache.update(fetched_at=0.0, body=None, etag=None)
+    with Phase(upstreams, trace_memory) as phase:
+        await timed_get(session, f"{base_url}/api/top-headlines", phase)
+        await timed_get(session, f"{base_url}/api/top-headlines")
+    scenario["headlines"] = phase.result
+    return scenario
+
+
+async def run(args, upstreams, startup):
+    import aiohttp
+    import uvicorn
+
+    import app
+    import main
+
+    main.show_login_url = lambda url: None  # The fake login completes on its own; don't open a browser
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app.app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    # The phases measure steady-state work, so the background import of the heavy dependencies
+    # that starts with the app is waited for here (and reported under "startup").
+    start = time.perf_counter()
+    await app._preload_task
+    startup["preload_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    scenarios = []
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None)) as session:
+            for size in args.sizes:
+                logging.warning(f"[bench] Running {size} holdings")
+                scenarios.append(await run_scenario(size, upstreams, session, f"http://127.0.0.1:{port}", args.trace_memory))
+    finally:
+        server.should_exit = True
+        await serving
+    return scenarios
+
+
+def check(results, baseline, tolerance):
+    """Regressions of `results` against `baseline`: more upstream calls, or latency beyond the tolerance."""
+    if results["config"]["upstream"] != baseline["config"]["upstream"]:
+        logging.warning("[bench] Upstream settings differ from the baseline's; latency comparisons may not be meaningful")
+    failures = []
+    baseline_by_size = {s["holdings"]: s for s in baseline["scenarios"]}
+    for scenario in results["scenarios"]:
+        base = baseline_by_size.get(scenario["holdings"])
+        if base is None:
+            continue
+        for name in PHASES:
+            current, expected = scenario[name], base.get(name, {})
+            for upstream, count in current["calls"].items():
+                allowed = expected.get("calls", {}).get(upstream, 0)
+                if count > allowed and not upstream.endswith("_errors"):
+                    failures.append(f"{scenario['holdings']} holdings / {name}: {count} {upstream} calls (baseline {allowed})")
+            for metric in ("ttfb_ms", "total_ms"):
+                if metric in expected and current[metric] > expected[metric] * (1 + tolerance) + LATENCY_SLACK_MS:
+                    failures.append(
+                        f"{scenario['holdings']} holdings / {name}: {metric} {current[metric]} (baseline {expected[metric]})"
+                    )
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard against local fake upstreams.")
+    parser.add_argument("--sizes", default="5,50,500", type=lambda v: [int(s) for s in v.split(",")],
+                        help="comma-separated portfolio sizes (default: 5,50,500)")
+    parser.add_argument("--latency-ms", type=float, default=50, help="latency of every fake upstream call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of Brave/OpenAI calls answered with a 5xx")
+    parser.add_argument("--articles", type=int, default=5, help="articles per Brave search response")
+    parser.add_argument("--description-chars", type=int, default=200, help="length of each article description")
+    parser.add_argument("--output", help="write the results JSON here (default: stdout)")
+    parser.add_argument("--check", metavar="BASELINE", help="compare with a baseline results file; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="allowed latency increase over the baseline (1.0 = 2x)")
+    parser.add_argument("--no-memory", dest="trace_memory", action="store_false",
+                        help="skip tracemalloc (it slows allocation-heavy phases down)")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's INFO logging")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(message)s")
+    upstreams = FakeUpstreams(
+        latency_ms=args.latency_ms, error_rate=args.error_rate,
+        articles=args.articles, description_chars=args.description_chars,
+    ).start()
+
+    with tempfile.TemporaryDirectory(prefix="stock-news-bench-") as workdir:
+        configure_environment(upstreams, workdir)
+        patch_yfinance(upstreams)
+        os.chdir(ROOT)  # The app loads templates/ and static/ relative to the working directory
+        if args.trace_memory:
+            tracemalloc.start()
+        startup = {}
+        start = time.perf_counter()
+        import app  # noqa: F401
+        startup["import_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        try:
+            scenarios = asyncio.run(run(args, upstreams, startup))
+        finally:
+            upstreams.stop()
+
+    results = {
+        "config": {
+            "upstream": {
+                "latency_ms": args.latency_ms, "error_rate": args.error_rate,
+                "articles": args.articles, "description_chars": args.description_chars,
+            },
+            "python": platform.python_version(),
+            "trace_memory": args.trace_memory,
+        },
+        "startup": startup,
+        "scenarios": scenarios,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.check:
+        with open(args.check) as f:
+            failures = check(results, json.load(f), args.tolerance)
+        for failure in failures:
+            logging.error(f"[bench] Regression: {failure}")
+        if failures:
+            return 1
+        logging.warning("[bench] No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+# brave.py
+"""
+Shared async client for the Brave News Search API.
+
+One aiohttp session (keep-alive connection pool) is reused for every call, a token bucket
+keeps us inside the plan's request rate, and 429/5xx responses are retried with exponential
+backoff plus jitter instead of failing the caller.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+
+import aiohttp
+
+from metrics import UPSTREAM_ERRORS, UPSTREAM_RETRIES
+
+BRAVE_NEWS_ENDPOINT = os.getenv("BRAVE_NEWS_ENDPOINT", "https://api.search.brave.com/res/v1/news/search")
+BRAVE_RATE_PER_SECOND = float(os.getenv("BRAVE_RATE_PER_SECOND", "1"))  # Free plan: 1 request/second
+BRAVE_BURST = int(os.getenv("BRAVE_BURST", "1"))
+BRAVE_MAX_RETRIES = int(os.getenv("BRAVE_MAX_RETRIES", "4"))
+BRAVE_BACKOFF_SECONDS = float(os.getenv("BRAVE_BACKOFF_SECONDS", "1"))  # First retry waits up to this long, then doubles
+BRAVE_TIMEOUT_SECONDS = float(os.getenv("BRAVE_TIMEOUT_SECONDS", "15"))
+BRAVE_POOL_SIZE = int(os.getenv("BRAVE_POOL_SIZE", "10"))
+
+
+class BraveSearchError(Exception):
+    """Raised when a Brave request fails for good (non-retryable status or retries exhausted)."""
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Waiters queue on the lock, so tokens are handed out in arrival order.
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class BraveClient:
+    def __init__(self, api_key, endpoint=BRAVE_NEWS_ENDPOINT, rate_per_second=BRAVE_RATE_PER_SECOND,
+                 burst=BRAVE_BURST, max_retries=BRAVE_MAX_RETRIES, backoff_seconds=BRAVE_BACKOFF_SECONDS):
+        self.api_key = api_key
+        self.endpoint = endpoint
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.limiter = TokenBucket(rate_per_second, burst)
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=BRAVE_POOL_SIZE, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=BRAVE_TIMEOUT_SECONDS),
+                headers={"X-Subscription-Token": self.api_key or "", "Accept": "application/json"},
+            )
+        return self._session
+
+    def _backoff(self, attempt, retry_after=None):
+        """Seconds to wait before retry number `attempt` (1-based): Retry-After if given, else full jitter."""
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return random.uniform(0, self.backoff_seconds * 2 ** (attempt - 1))
+
+    async def search_news(self, params):
+        """Runs one news search and returns the `results` list."""
+        try:
+            return await self._search_news(params)
+        except BraveSearchError:
+            UPSTREAM_ERRORS.inc(upstream="brave")
+            raise
+
+    async def _search_news(self, params):
+        session = self._get_session()
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            try:
+                async with session.get(self.endpoint, params=params) as resp:
+                    if resp.status == 429 or resp.status >= 500:
+                        if attempt == self.max_retries:
+                            raise BraveSearchError(f"Brave returned {resp.status} after {attempt + 1} attempts")
+                        delay = self._backoff(attempt + 1, resp.headers.get("Retry-After"))
+                        logging.warning(f"[Brave] {resp.status} for {params.get('q')!r}; retrying in {delay:.1f}s")
+                    elif resp.status >= 400:
+                        raise BraveSearchError(f"Brave returned {resp.status}: {await resp.text()}")
+                    else:
+                        return (await resp.json()).get("results", [])
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    raise BraveSearchError(f"Brave request failed after {attempt + 1} attempts: {e!r}") from e
+                delay = self._backoff(attempt + 1)
+                logging.warning(f"[Brave] {e!r} for {params.get('q')!r}; retrying in {delay:.1f}s")
+            UPSTREAM_RETRIES.inc(upstream="brave")
+            await asyncio.sleep(delay)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -0,0 +1,125 @@
+# compression.py
+"""
+gzip/br response compression.
+
+Starlette's GZipMiddleware doesn't flush between chunks of a streaming response, so the
+streamed dashboard would sit in the compressor until enough of it piled up. This middleware
+flushes after every chunk, so each card still reaches the browser as soon as it is sent.
+Brotli is used when the `brotli` package is installed and the client accepts it; otherwise
+gzip. Server-sent events, responses that already carry a Content-Encoding, and bodies below
+`minimum_size` go out as they are.
+
+A compressed body is a different representation from the uncompressed one, so a strong ETag
+is weakened (W/"...") on the way out; `etag_matches` ignores the prefix when comparing.
+"""
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+EXCLUDED_CONTENT_TYPES = ("text/event-stream",)
+
+
+def choose_encoding(accept_encoding):
+    """The best encoding we support out of an Accept-Encoding header, or None."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+class _Gzip:
+    def __init__(self, level):
+        self._c = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+    def chunk(self, data):
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data):
+        return self._c.compress(data) + self._c.flush()
+
+
+class _Brotli:
+    def __init__(self, quality):
+        self._c = brotli.Compressor(quality=quality)
+
+    def chunk(self, data):
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self, data):
+        return self._c.process(data) + self._c.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=500, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", "")) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message  # Held back until the first body chunk decides the headers
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+                passthrough = (
+                    "content-encoding" in headers
+                    or headers.get("content-type", "").startswith(EXCLUDED_CONTENT_TYPES)
+                    or (len(body) < self.minimum_size and not more_body)
+                )
+                if not passthrough:
+                    compressor = _Brotli(self.brotli_quality) if encoding == "br" else _Gzip(self.gzip_level)
+                    body = compressor.chunk(body) if more_body else compressor.finish(body)
+                    headers["Content-Encoding"] = encoding
+                    headers.add_vary_header("Accept-Encoding")
+                    if more_body:
+                        if "content-length" in headers:
+                            del headers["Content-Length"]
+                    else:
+                        headers["Content-Length"] = str(len(body))
+                if not passthrough or start["status"] == 304:
+                    # A 304 has no body, but must name the ETag the compressed 200 would have.
+                    etag = headers.get("etag")
+                    if etag and not etag.startswith("W/"):
+                        headers["ETag"] = f"W/{etag}"
+                await send(start)
+                start = None
+            elif not passthrough:
+                body = compressor.chunk(body) if more_body else compressor.finish(body)
+
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -5,24 +5,83 @@ from typing import AsyncGenerator
 from dotenv import load_dotenv
 from fastapi import Depends
 from fastapi_users.db import SQLAlchemyUserDatabase
+from sqlalchemy import inspect, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import  sessionmaker
 
+from models import Base, User
+
 
 load_dotenv()
 _raw_db_url = os.getenv("DATABASE_URL", "")
-# transform to asyncpg driver
+# transform to asyncpg driver (Render hands out postgres://, other hosts postgresql://)
 if _raw_db_url.startswith("postgres://"):
     DATABASE_URL = _raw_db_url.replace("postgres://", "postgresql+asyncpg://", 1)
+elif _raw_db_url.startswith("postgresql://"):
+    DATABASE_URL = _raw_db_url.replace("postgresql://", "postgresql+asyncpg://", 1)
 else:
     DATABASE_URL = _raw_db_url
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+DB_ECHO = os.getenv("DB_ECHO", "0") == "1"  # Log every SQL statement; for debugging only
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))  # Connections kept open per worker
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))  # Extra connections allowed under bursts
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Reopen connections older than this (seconds)
+# Prepared statements cached per connection; set to 0 behind PgBouncer in transaction mode.
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+
+_engine_options = {"echo": DB_ECHO}
+if DATABASE_URL.startswith("postgresql+asyncpg://"):
+    _engine_options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,  # Managed Postgres drops idle connections; check before handing one out
+        connect_args={
+            "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            # The cache queries are short; JIT compilation only adds latency to them.
+            "server_settings": {"jit": "off"},
+        },
+    )
+
+engine = create_async_engine(DATABASE_URL, **_engine_options)
 async_session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+def _cached_news_columns(sync_conn):
+    return {column["name"] for column in inspect(sync_conn).get_columns("cached_news")}
+
+async def _migrate_shared_news_cache(conn):
+    """
+    cached_news used to be keyed by user. Its rows are only a cache, so per-user rows are
+    dropped, and of several shared rows for a symbol only the newest is kept, so the table
+    becomes one row per symbol.
+    """
+    if "user_id" not in await conn.run_sync(_cached_news_columns):
+        return
+    await conn.execute(text("DELETE FROM cached_news WHERE user_id IS NOT NULL"))
+    await conn.execute(text(
+        """
+        DELETE FROM cached_news WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY timestamp DESC NULLS LAST, id DESC) AS rank
+                FROM cached_news
+            ) ranked WHERE rank > 1
+        )
+        """
+    ))
+    await conn.execute(text("ALTER TABLE cached_news DROP COLUMN user_id"))
+    await conn.execute(text("DROP INDEX IF EXISTS ix_cached_news_symbol"))
+    await conn.execute(text("CREATE UNIQUE INDEX ix_cached_news_symbol ON cached_news (symbol)"))
+
 async def create_db_and_tables():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await _migrate_shared_news_cache(conn)
+        # create_all leaves existing tables alone, so columns added since go in by hand.
+        for column in ("fundamentals", "watermark"):
+            await conn.execute(text(f"ALTER TABLE cached_news ADD COLUMN IF NOT EXISTS {column} JSON"))
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
@@ -0,0 +1,109 @@
+# holdings_store.py
+"""
+Local store for the Kite portfolio (holdings and positions).
+
+The sync daemon in main.py hands every poll's rows to `sync()`, which compares them with
+what is stored and writes only the rows that were added, changed or removed, in one
+transaction. Each sync also records when it ran (a row of kind "sync"), so an account that
+really holds nothing can be told apart from one that was never synced. The dashboard reads
+from here instead of holdings.csv.
+"""
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+HOLDINGS_DB_PATH = os.getenv("HOLDINGS_DB_PATH", "holdings.db")
+
+# Only these fields are stored and compared. Prices and P&L change on every poll and come from
+# the price store anyway, so including them would turn every poll into a full rewrite.
+TRACKED_FIELDS = {
+    "holdings": ("tradingsymbol", "exchange", "isin", "quantity", "t1_quantity", "average_price"),
+    "positions": ("tradingsymbol", "exchange", "product", "quantity", "overnight_quantity", "average_price"),
+}
+
+
+def row_key(kind, row):
+    if kind == "holdings":
+        return row.get("tradingsymbol", "")
+    return ":".join(str(row.get(field, "")) for field in ("exchange", "tradingsymbol", "product"))
+
+
+class HoldingsStore:
+    def __init__(self, path=HOLDINGS_DB_PATH):
+        self.path = path
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS portfolio (
+                    kind       TEXT NOT NULL,
+                    key        TEXT NOT NULL,
+                    data       TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (kind, key)
+                )
+                """
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def load(self, kind="holdings"):
+        """Stored rows of `kind`, ordered by key."""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT data FROM portfolio WHERE kind = ? ORDER BY key", (kind,)).fetchall()
+        finally:
+            conn.close()
+        return [json.loads(data) for (data,) in rows]
+
+    def last_synced(self, kind="holdings"):
+        """When rows of `kind` were last synced (an ISO timestamp), or None if they never were."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT updated_at FROM portfolio WHERE kind = 'sync' AND key = ?", (kind,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def sync(self, kind, rows):
+        """
+        Makes the stored rows of `kind` match `rows`, writing only the difference.
+        Returns {"added": n, "changed": n, "removed": n}.
+        """
+        fields = TRACKED_FIELDS[kind]
+        incoming = {}
+        for row in rows:
+            key = row_key(kind, row)
+            if key:
+                incoming[key] = json.dumps({f: row.get(f) for f in fields}, sort_keys=True)
+
+        now = datetime.now(timezone.utc).isoformat()
+        conn = self._connect()
+        try:
+            # IMMEDIATE takes the write lock up front so two syncs can't interleave their diffs.
+            conn.execute("BEGIN IMMEDIATE")
+            stored = dict(conn.execute("SELECT key, data FROM portfolio WHERE kind = ?", (kind,)).fetchall())
+            added = [k for k in incoming if k not in stored]
+            changed = [k for k in incoming if k in stored and stored[k] != incoming[k]]
+            removed = [k for k in stored if k not in incoming]
+            conn.executemany(
+                "INSERT OR REPLACE INTO portfolio (kind, key, data, updated_at) VALUES (?, ?, ?, ?)",
+                [(kind, k, incoming[k], now) for k in added + changed],
+            )
+            conn.executemany("DELETE FROM portfolio WHERE kind = ? AND key = ?", [(kind, k) for k in removed])
+            conn.execute(
+                "INSERT OR REPLACE INTO portfolio (kind, key, data, updated_at) VALUES ('sync', ?, '{}', ?)", (kind, now),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return {"added": len(added), "changed": len(changed), "removed": len(removed)}
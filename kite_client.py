@@ -0,0 +1,337 @@
+# kite_client.py
+"""
+Long-lived client for the Kite MCP server.
+
+The Kite login is bound to the SSE session (see README), so this keeps one session open
+for as long as possible and reconnects with backoff when it drops. After a reconnect the
+new session has to be logged in again; `run_sync_daemon` asks for that through the
+`on_login_url` callback and keeps polling until the login goes through.
+
+MCP requests carry their own ids, so several tool calls can be in flight on the one session
+at once; `call_many` sends them together with a timeout per call, and every round trip is
+timed per tool (`latency_stats`) so it is visible where sync time goes.
+
+The server URL is configurable (KITE_MCP_URL), so the client can be pointed at a local
+stand-in MCP server that implements `login`, `get_profile`, `get_holdings`, `get_positions`,
+`get_margins` and `get_quotes`.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import time
+from collections import defaultdict, deque
+
+from fastmcp import Client
+from fastmcp.client.transports import SSETransport
+from fastmcp.exceptions import ToolError
+
+KITE_MCP_URL = os.getenv("KITE_MCP_URL", "https://mcp.kite.trade/sse")
+SYNC_INTERVAL_SECONDS = float(os.getenv("KITE_SYNC_INTERVAL_SECONDS", "300"))
+AUTH_POLL_SECONDS = 5  # How often to retry while waiting for the browser login
+LOGIN_TIMEOUT_SECONDS = float(os.getenv("KITE_LOGIN_TIMEOUT_SECONDS", "300"))
+CALL_TIMEOUT_SECONDS = float(os.getenv("KITE_CALL_TIMEOUT_SECONDS", "20"))
+RECONNECT_BASE_SECONDS = 1
+RECONNECT_MAX_SECONDS = 60
+LATENCY_SAMPLES = 100  # Round trips kept per tool for latency_stats()
+READY_PROBE_TOOL = "get_profile"  # Cheap call that fails with an auth error until the login completes
+
+_AUTH_ERROR_RE = re.compile(r"\blog ?in\b|not authenticated|unauthori[sz]ed|session (has )?expired", re.IGNORECASE)
+
+
+def quote_instruments(symbols, exchange="NSE"):
+    """Instrument ids in the EXCHANGE:TRADINGSYMBOL form `get_quotes` expects."""
+    return [f"{exchange}:{s}" for s in symbols]
+
+
+class KiteAuthError(Exception):
+    """The MCP session is not (or no longer) logged in to Kite."""
+
+
+class KiteResponseError(Exception):
+    """A tool answered with something other than the data it should return."""
+
+
+def extract_login_url(login_result):
+    """Pulls the Kite login URL out of the `login` tool's response."""
+    if isinstance(login_result, list):
+        for item in login_result:
+            if getattr(item, "type", "") == "text":
+                text = item.text
+
+                # 1) Try to grab the Markdown link [Login to Kite](https://...)
+                m = re.search(r"\[Login to Kite\]\((https://kite\.zerodha\.com[^\)]+)\)", text)
+                if m:
+                    return m.group(1)
+
+                # 2) Fallback: grab the first https://… substring in the text
+                urls = re.findall(r"(https://[^\s\)\]]+)", text)
+                if urls:
+                    return urls[0]
+    return None
+
+
+def portfolio_rows(tool, result):
+    """`result` if it is a list of row dicts; raises KiteResponseError for anything else."""
+    if not isinstance(result, list) or not all(isinstance(row, dict) for row in result):
+        raise KiteResponseError(f"{tool} returned {type(result).__name__} instead of a list of rows: {str(result)[:200]!r}")
+    return result
+
+
+def parse_tool_json(result):
+    """
+    Tool results usually come back as a single TextContent(text='[...]'); returns the decoded
+    JSON, or the plain text when it isn't JSON.
+    """
+    if isinstance(result, list) and len(result) == 1 and hasattr(result[0], "text"):
+        try:
+            return json.loads(result[0].text)
+        except json.JSONDecodeError:
+            return result[0].text
+    return result
+
+
+class KiteMCPClient:
+    def __init__(self, url=KITE_MCP_URL, on_login_url=None):
+        self.url = url
+        self.on_login_url = on_login_url or (lambda url: logging.info(f"[kite] Log in at {url}"))
+        self._client = None
+        self._session_task = None
+        self._stop = None
+        self._connect_lock = asyncio.Lock()
+        self._login_requested = False
+        self._latencies = defaultdict(lambda: deque(maxlen=LATENCY_SAMPLES))
+        self._errors = defaultdict(int)
+
+    @property
+    def connected(self):
+        return self._client is not None and self._client.is_connected()
+
+    async def _run_session(self, ready):
+        # The SSE transport runs inside an anyio task group that must be entered and exited by the
+        # same task, so the session lives in its own task for its whole lifetime.
+        try:
+            async with Client(SSETransport(url=self.url, headers={})) as client:
+                self._client = client
+                ready.set_result(None)
+                await self._stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logging.warning(f"[kite] Session closed: {e!r}")
+        finally:
+            self._client = None
+
+    async def connect(self):
+        """Opens the SSE session if it isn't open, retrying with exponential backoff plus jitter."""
+        async with self._connect_lock:
+            if self.connected:
+                return
+            await self._close_session()
+            attempt = 0
+            while True:
+                self._stop = asyncio.Event()
+                ready = asyncio.get_running_loop().create_future()
+                self._session_task = asyncio.create_task(self._run_session(ready))
+                try:
+                    await ready
+                    self._login_requested = False  # A new session starts logged out
+                    logging.info(f"[kite] Connected to {self.url}")
+                    return
+                except Exception as e:
+                    delay = min(RECONNECT_MAX_SECONDS, RECONNECT_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1)
+                    attempt += 1
+                    logging.warning(f"[kite] Connect failed ({e!r}); retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+    async def _close_session(self):
+        task, self._session_task = self._session_task, None
+        if task is not None:
+            self._stop.set()
+            try:
+                await task
+            except Exception as e:
+                logging.debug(f"[kite] Error while closing the old session: {e!r}")
+
+    async def close(self):
+        await self._close_session()
+
+    async def _timed_call(self, client, name, arguments):
+        start = time.perf_counter()
+        try:
+            return await client.call_tool(name, arguments or {})
+        except BaseException:
+            # Includes cancellation by a call timeout, which is exactly the slow case worth seeing.
+            self._errors[name] += 1
+            raise
+        finally:
+            self._latencies[name].append((time.perf_counter() - start) * 1000)
+
+    async def _call_raw(self, name, arguments=None):
+        """Calls a tool, reconnecting once if the session has dropped."""
+        await self.connect()
+        client = self._client
+        try:
+            return await self._timed_call(client, name, arguments)
+        except ToolError:
+            raise
+        except Exception as e:
+            logging.warning(f"[kite] {name} failed ({e!r}); reconnecting")
+            # With several calls in flight only the first failure should tear down the session;
+            # the others find it already replaced and just retry on the new one.
+            async with self._connect_lock:
+                if self._client is client:
+                    await self._close_session()
+            await self.connect()
+            return await self._timed_call(self._client, name, arguments)
+
+    async def call_tool(self, name, arguments=None, timeout=CALL_TIMEOUT_SECONDS):
+        """
+        Calls a tool and returns its decoded JSON; raises KiteAuthError if the session isn't logged
+        in and asyncio.TimeoutError if no response arrives within `timeout` seconds.
+        """
+        try:
+            result = parse_tool_json(await asyncio.wait_for(self._call_raw(name, arguments), timeout))
+        except ToolError as e:
+            if _AUTH_ERROR_RE.search(str(e)):
+                raise KiteAuthError(str(e)) from e
+            raise
+        if isinstance(result, str) and _AUTH_ERROR_RE.search(result):
+            raise KiteAuthError(result)
+        return result
+
+    async def call_many(self, calls, timeout=CALL_TIMEOUT_SECONDS):
+        """
+        Sends several tool calls concurrently over the session. `calls` maps a label to
+        (tool_name, arguments); returns {label: result or the exception that call raised},
+        so one slow or failing tool doesn't cost the others their results.
+        """
+        labels = list(calls)
+        results = await asyncio.gather(
+            *(self.call_tool(name, arguments, timeout=timeout) for name, arguments in calls.values()),
+            return_exceptions=True,
+        )
+        return dict(zip(labels, results))
+
+    def latency_stats(self):
+        """{tool: {"calls", "errors", "last_ms", "p50_ms", "max_ms"}} over the recent round trips."""
+        stats = {}
+        for name, samples in self._latencies.items():
+            ordered = sorted(samples)
+            stats[name] = {
+                "calls": len(samples),
+                "errors": self._errors[name],
+                "last_ms": round(samples[-1], 1),
+                "p50_ms": round(ordered[len(ordered) // 2], 1),
+                "max_ms": round(ordered[-1], 1),
+            }
+        return stats
+
+    async def wait_until_ready(self, timeout=LOGIN_TIMEOUT_SECONDS, poll=AUTH_POLL_SECONDS):
+        """
+        Polls a cheap tool until the session is logged in. Returns True once it is, False if
+        `timeout` seconds pass first.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                await self.call_tool(READY_PROBE_TOOL)
+                return True
+            except KiteAuthError:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(poll, remaining))
+
+    async def login(self):
+        """Asks the server for a login URL for this session and hands it to `on_login_url`."""
+        url = extract_login_url(await self._call_raw("login"))
+        if not url:
+            raise KiteAuthError("Could not extract a login URL from the login tool's response")
+        self._login_requested = True
+        self.on_login_url(url)
+        return url
+
+    async def fetch_portfolio(self, symbols=None, timeout=CALL_TIMEOUT_SECONDS):
+        """
+        Holdings, (net) positions, margins and quotes in one concurrent round. Quotes are asked
+        for `symbols` (e.g. the last stored holdings) alongside the rest; without them they follow
+        once holdings arrive. Holdings and positions are required: their errors are raised, as is
+        KiteResponseError when either isn't a list of rows. Margins and quotes come back as None
+        when their call fails.
+        """
+        calls = {
+            "holdings": ("get_holdings", {}),
+            "positions": ("get_positions", {}),
+            "margins": ("get_margins", {}),
+        }
+        if symbols:
+            calls["quotes"] = ("get_quotes", {"instruments": quote_instruments(symbols)})
+        results = await self.call_many(calls, timeout=timeout)
+
+        for label in ("holdings", "positions"):
+            if isinstance(results[label], BaseException):
+                raise results[label]
+        holdings = portfolio_rows("get_holdings", results["holdings"])
+        positions = results["positions"]
+        if isinstance(positions, dict):
+            positions = positions.get("net") or []
+        positions = portfolio_rows("get_positions", positions)
+
+        held = {h.get("tradingsymbol") for h in holdings} - {None}
+        if held - set(symbols or ()):
+            # No symbols were known up front, or holdings now include new ones.
+            results.update(await self.call_many(
+                {"quotes": ("get_quotes", {"instruments": quote_instruments(sorted(held))})}, timeout=timeout
+            ))
+        extras = {}
+        for label in ("margins", "quotes"):
+            value = results.get(label)
+            if isinstance(value, BaseException):
+                logging.warning(f"[kite] Fetching {label} failed: {value!r}")
+                value = None
+            extras[label] = value
+        return {"holdings": holdings, "positions": positions, **extras}
+
+    async def sync_portfolio(self, store):
+        """Fetches the portfolio and writes only the changed holdings/position rows to `store`."""
+        known = [row.get("tradingsymbol") for row in await asyncio.to_thread(store.load, "holdings")]
+        start = time.perf_counter()
+        portfolio = await self.fetch_portfolio(symbols=[s for s in known if s])
+        fetch_ms = (time.perf_counter() - start) * 1000
+        holding_changes = await asyncio.to_thread(store.sync, "holdings", portfolio["holdings"])
+        position_changes = await asyncio.to_thread(store.sync, "positions", portfolio["positions"])
+        logging.info(
+            f"[kite] Synced holdings {holding_changes}, positions {position_changes} "
+            f"(fetch {fetch_ms:.0f} ms; per tool {self.latency_stats()})"
+        )
+        return {
+            "holdings": holding_changes,
+            "positions": position_changes,
+            "margins": portfolio["margins"],
+            "quotes": portfolio["quotes"],
+        }
+
+    async def run_sync_daemon(self, store, interval=SYNC_INTERVAL_SECONDS):
+        """Polls the portfolio every `interval` seconds for as long as it runs, logging in again when needed."""
+        while True:
+            try:
+                await self.sync_portfolio(store)
+            except KiteAuthError:
+                if not self._login_requested:
+                    logging.info("[kite] Session is not logged in; requesting a login URL")
+                    try:
+                        await self.login()
+                    except Exception as e:
+                        logging.error(f"[kite] Login request failed: {e!r}")
+                await asyncio.sleep(AUTH_POLL_SECONDS)
+                continue
+            except Exception as e:
+                logging.error(f"[kite] Portfolio sync failed: {e!r}")
+            else:
+                self._login_requested = False  # Logged in; ask again once this session expires
+            await asyncio.sleep(interval)
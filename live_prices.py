@@ -0,0 +1,143 @@
+# live_prices.py
+"""
+Live prices for every open dashboard from one poller.
+
+`PriceHub` polls quotes for the union of held symbols every `interval` seconds, but only while
+at least one dashboard is subscribed. Upstream traffic therefore grows with the number of
+distinct symbols and not with the number of viewers. For each holding whose quote moved it
+recomputes value, P&L and day P&L. The portfolio totals are adjusted by that holding's change
+rather than summed again over every holding. The changed rows are then pushed to every
+subscriber.
+
+Each subscriber gets a dict of pending rows, keyed by symbol, rather than a queue of messages.
+A dashboard that falls behind gets the latest row per symbol on its next read, so memory stays
+bounded by the number of holdings however slow the client is. A new subscriber starts with the
+current rows, so it doesn't wait for the next tick to show anything.
+
+Each worker process runs its own hub. Their polls go through the shared market store (see
+`get_market_data`), so extra workers mostly read what another one already fetched.
+"""
+import asyncio
+import logging
+
+from metrics import timed
+
+TOTAL_FIELDS = ("value", "invested", "pnl", "day_pnl")
+
+
+def position_row(quantity, avg_price, quote):
+    """A holding's live figures from its quote; None values where the quote or position is unknown."""
+    last = quote.get("last_price")
+    change_pct = quote.get("day_change_pct")
+    if last is None or quantity is None:
+        return {"last_price": last, "day_change_pct": change_pct, **dict.fromkeys(TOTAL_FIELDS)}
+    prev_close = last / (1 + change_pct / 100) if change_pct is not None else None
+    invested = quantity * avg_price if avg_price is not None else None
+    return {
+        "last_price": round(last, 2),
+        "day_change_pct": round(change_pct, 2) if change_pct is not None else None,
+        "value": round(quantity * last, 2),
+        "invested": round(invested, 2) if invested is not None else None,
+        "pnl": round(quantity * last - invested, 2) if invested is not None else None,
+        "day_pnl": round(quantity * (last - prev_close), 2) if prev_close is not None else None,
+    }
+
+
+class _Subscriber:
+    def __init__(self, rows):
+        self.pending = dict(rows)
+        self.event = asyncio.Event()
+        if rows:
+            self.event.set()
+
+
+class PriceHub:
+    def __init__(self, fetch_quotes, load_positions, interval):
+        """
+        `fetch_quotes(symbols)` is a coroutine returning {symbol: {"last_price", "day_change_pct", ...}};
+        `load_positions()` returns {symbol: (quantity, avg_price)} and runs in a worker thread.
+        """
+        self.fetch_quotes = fetch_quotes
+        self.load_positions = load_positions
+        self.interval = interval
+        self.rows = {}
+        self.totals = dict.fromkeys(TOTAL_FIELDS, 0.0)
+        self._subscribers = set()
+        self._task = None
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    def _apply(self, symbol, row):
+        """Replaces one holding's row, moving the totals by the difference."""
+        old = self.rows.pop(symbol, None) or {}
+        for field in TOTAL_FIELDS:
+            self.totals[field] += ((row or {}).get(field) or 0.0) - (old.get(field) or 0.0)
+        if row is not None:
+            self.rows[symbol] = row
+
+    def summary(self):
+        totals = {field: round(value, 2) for field, value in self.totals.items()}
+        prev_value = totals["value"] - totals["day_pnl"]
+        totals["day_change_pct"] = round(totals["day_pnl"] / prev_value * 100, 2) if prev_value > 0 else None
+        totals["pnl_pct"] = round(totals["pnl"] / totals["invested"] * 100, 2) if totals["invested"] > 0 else None
+        return totals
+
+    async def tick(self):
+        """Polls once and pushes the rows that changed; returns how many did."""
+        positions = await asyncio.to_thread(self.load_positions)
+        with timed("live_prices.poll"):
+            quotes = await self.fetch_quotes(list(positions))
+        changed = {}
+        for symbol, (quantity, avg_price) in positions.items():
+            row = position_row(quantity, avg_price, quotes.get(symbol) or {})
+            if row != self.rows.get(symbol):
+                self._apply(symbol, row)
+                changed[symbol] = row
+        for symbol in self.rows.keys() - positions.keys():
+            self._apply(symbol, None)
+            changed[symbol] = None  # No longer held; the page drops its live figures
+        if changed:
+            for subscriber in self._subscribers:
+                subscriber.pending.update(changed)
+                subscriber.event.set()
+        return len(changed)
+
+    async def _run(self):
+        while self._subscribers:
+            try:
+                changed = await self.tick()
+                logging.info(f"[live] {changed} of {len(self.rows)} holdings moved; {len(self._subscribers)} subscribers")
+            except Exception as e:
+                logging.error(f"[live] Quote poll failed: {e!r}")
+            await asyncio.sleep(self.interval)
+        self._task = None
+
+    async def stream(self, keepalive):
+        """
+        Yields {"holdings": {symbol: row or None}, "totals": {...}} whenever rows change, starting
+        with every known row, and None after `keepalive` seconds without one. The poller runs
+        for as long as any stream is open.
+        """
+        subscriber = _Subscriber(self.rows)
+        self._subscribers.add(subscriber)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.event.wait(), keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                subscriber.event.clear()
+                rows, subscriber.pending = subscriber.pending, {}
+                yield {"holdings": rows, "totals": self.summary()}
+        finally:
+            self._subscribers.discard(subscriber)
+
+    async def close(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
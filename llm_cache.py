@@ -0,0 +1,172 @@
+# llm_cache.py
+"""
+Content-addressed cache for GPT results used by app.py.
+
+Keys hash everything that can change an answer (the article URL and text, the company,
+the model and the prompt version), so the same story is scored once no matter which
+symbol or refresh finds it, and bumping a prompt version invalidates only that prompt.
+Entries expire after a TTL and the least recently used ones are evicted past a size limit.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import CACHE_REQUESTS
+from news_store import SQLITE_MAX_VARIABLES
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+EVICT_EVERY_WRITES = 200  # Check the size bound every N writes rather than on every write
+
+
+def make_key(kind, model, prompt_version, **parts):
+    """Stable SHA-256 key for one LLM call, e.g. make_key("score", model, "1", url=..., title=...)."""
+    payload = json.dumps(
+        {"kind": kind, "model": model, "prompt_version": prompt_version, **parts},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def article_key(kind, model, prompt_version, article, company_name=""):
+    """Key for a per-article result; the article is identified by its URL and text."""
+    return make_key(
+        kind, model, prompt_version,
+        url=article.get("url") or "", title=article.get("title") or "",
+        description=article.get("description") or "", company=company_name,
+    )
+
+
+class LLMCache:
+    """SQLite-backed TTL + LRU cache with hit/miss counters. Safe to use from worker threads."""
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl_seconds=LLM_CACHE_TTL_DAYS * 86400, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key        TEXT PRIMARY KEY,
+                    value      TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used  REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_many(self, keys):
+        """Returns {key: value} for the keys that have a live entry; touches them for LRU."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        conn = self._connect()
+        try:
+            with conn:
+                for i in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                    chunk = keys[i:i + SQLITE_MAX_VARIABLES]
+                    rows = conn.execute(
+                        f"SELECT key, value FROM llm_cache WHERE key IN ({','.join('?' * len(chunk))}) AND created_at >= ?",
+                        [*chunk, now - self.ttl_seconds],
+                    ).fetchall()
+                    found.update((key, json.loads(value)) for key, value in rows)
+                if found:
+                    conn.executemany("UPDATE llm_cache SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+        except sqlite3.Error as e:
+            logging.error(f"⚠️ LLM cache read failed: {e}")
+        finally:
+            conn.close()
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        CACHE_REQUESTS.inc(len(found), cache="llm", result="hit")
+        CACHE_REQUESTS.inc(len(keys) - len(found), cache="llm", result="miss")
+        return found
+
+    def get(self, key):
+        """Returns the cached value for `key`, or None on a miss."""
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items):
+        """Stores {key: value} (values must be JSON-serialisable)."""
+        if not items:
+            return
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                    [(k, json.dumps(v), now, now) for k, v in items.items()],
+                )
+        except sqlite3.Error as e:
+            logging.error(f"⚠️ LLM cache write failed: {e}")
+        finally:
+            conn.close()
+        with self._lock:
+            self._writes += len(items)
+            due = self._writes >= EVICT_EVERY_WRITES
+            if due:
+                self._writes = 0
+        if due:
+            self.evict()
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def evict(self):
+        """Drops expired entries, then the least recently used ones beyond `max_entries`."""
+        conn = self._connect()
+        try:
+            with conn:
+                expired = conn.execute(
+                    "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+                ).rowcount
+                (size,) = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+                overflow = max(0, size - self.max_entries)
+                if overflow:
+                    conn.execute(
+                        "DELETE FROM llm_cache WHERE key IN "
+                        "(SELECT key FROM llm_cache ORDER BY last_used ASC LIMIT ?)",
+                        (overflow,),
+                    )
+        except sqlite3.Error as e:
+            logging.error(f"⚠️ LLM cache eviction failed: {e}")
+            return
+        finally:
+            conn.close()
+        with self._lock:
+            self.evictions += expired + overflow
+        if expired or overflow:
+            logging.info(f"[LLM cache] Evicted {expired} expired and {overflow} least recently used entries")
+
+    def stats(self):
+        """Hit/miss/eviction counters since startup."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_ratio": (self.hits / total) if total else None,
+            }
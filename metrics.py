@@ -0,0 +1,182 @@
+# metrics.py
+"""
+In-process metrics, rendered in the Prometheus text format at /metrics.
+
+A small counter/histogram registry rather than prometheus_client, to keep the dependency
+list as it is. Updates take a lock, since the GPT helpers and yfinance run in worker
+threads. Every worker process keeps its own values, so with several workers each one
+has to be scraped.
+
+`timed(stage, symbol)` is how code reports a stage: it records a `stage_seconds`
+observation, and when a request has opted into a timing breakdown (see
+`collect_timings`) it also adds the time to that request's Server-Timing header.
+"""
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels.get(name, "")) for name in self.labelnames), 0)
+
+    def samples(self):
+        with _lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self.buckets = (*sorted(buckets), math.inf)
+        self._values = {}  # label values -> [count per bucket..., sum, count]
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with _lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self):
+        with _lock:
+            items = sorted((key, list(row)) for key, row in self._values.items())
+        for key, row in items:
+            for bound, count in zip(self.buckets, row):
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', _format_value(float(bound)))])} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(row[-2])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {row[-1]}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "stock_news_stage_seconds", "Time spent in each stage of page builds and news refreshes.", ("stage", "symbol"),
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "stock_news_cache_requests_total", "Cache lookups by cache and result.", ("cache", "result"),
+))
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    "stock_news_upstream_errors_total", "Failed calls to upstream services after any retries.", ("upstream",),
+))
+UPSTREAM_RETRIES = REGISTRY.register(Counter(
+    "stock_news_upstream_retries_total", "Retried calls to upstream services.", ("upstream",),
+))
+OPENAI_TOKENS = REGISTRY.register(Counter(
+    "stock_news_openai_tokens_total", "OpenAI tokens used, as reported by the API responses.", ("helper", "type"),
+))
+
+# Per-request stage totals for the Server-Timing header; None outside requests that asked for it.
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed(stage, symbol=""):
+    """Records how long the block takes as a `stage_seconds` observation (errors included)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage, symbol=symbol)
+        timings = _request_timings.get()
+        if timings is not None:
+            with _lock:
+                timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+async def timed_await(stage, awaitable, symbol=""):
+    """Awaits `awaitable` inside `timed(stage, symbol)`; handy for one branch of an asyncio.gather."""
+    with timed(stage, symbol):
+        return await awaitable
+
+
+@contextmanager
+def collect_timings():
+    """
+    Collects the stages timed during the block (including in tasks and threads it starts) and
+    yields the dict they are summed into. Use `server_timing()` to turn it into a header.
+    """
+    timings = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def server_timing(timings):
+    """Server-Timing header value for a `collect_timings` dict, e.g. `market_data;dur=812.4`."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def record_openai_usage(helper, resp):
+    """Adds the token counts from a chat completion response, if it reports any."""
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        tokens = getattr(usage, kind, None)
+        if tokens:
+            OPENAI_TOKENS.inc(tokens, helper=helper, type=kind.removesuffix("_tokens"))
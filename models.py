@@ -16,9 +16,9 @@ class User(Base, SQLAlchemyBaseUserTable[int]):
     #   id = Column(Integer, primary_key=True)
     #   email, hashed_password, is_active, ...
     # so just add your relationships.
+    # Only holdings and API keys are per user; news and market data are shared per symbol.
     holdings     = relationship("Holding",    back_populates="user", cascade="all, delete-orphan")
     api_keys     = relationship("APIKey",     back_populates="user", uselist=False, cascade="all, delete-orphan")
-    cached_news  = relationship("CachedNews", back_populates="user", cascade="all, delete-orphan")
 
 
 # 2) All other tables must subclass Base so metadata is tracked:
@@ -30,7 +30,7 @@ class Holding(Base):
     quantity      = Column(Float, nullable=False)
     average_price = Column(Float, nullable=False)
 
-    user_id = Column(Integer, ForeignKey("user.id"))
+    user_id = Column(Integer, ForeignKey("user.id"), index=True)
     user    = relationship("User", back_populates="holdings")
 
 
@@ -45,17 +45,25 @@ class APIKey(Base):
     user    = relationship("User", back_populates="api_keys")
 
 
+# 3) Shared per-symbol caches: one row per symbol, read by every user who holds it.
 class CachedNews(Base):
     __tablename__ = "cached_news"
 
     id        = Column(Integer, primary_key=True)
-    symbol    = Column(String, nullable=False, index=True)
+    symbol    = Column(String, nullable=False, unique=True, index=True)
     articles  = Column(JSON,   nullable=False)
+    fundamentals = Column(JSON, nullable=True)
+    watermark = Column(JSON, nullable=True)  # Latest page_age and URLs seen by earlier refreshes
     timestamp = Column(
         DateTime(timezone=True),
         server_default=func.now(),
         server_onupdate=func.now()
     )
 
-    user_id = Column(Integer, ForeignKey("user.id"))
-    user    = relationship("User", back_populates="cached_news")
+
+class MarketSnapshot(Base):
+    __tablename__ = "market_snapshots"
+
+    symbol     = Column(String, primary_key=True)
+    data       = Column(JSON, nullable=False)  # price_store summary: last price, 1D-1Y returns, 52W range
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,292 @@
+# news_store.py
+"""
+Per-symbol caches used by app.py: scored news and the market-data summary.
+
+Both are keyed by symbol only, never by user, so every user holding a symbol reads the
+same rows and a symbol's search, scoring and price download are paid for once. Each symbol
+is one row, so the homepage reads only the symbols it renders and a refresh writes its
+symbol as soon as it finishes. Each cache has two backends with the same async interface:
+
+- CachedNewsStore / MarketSnapshotStore: the `cached_news` and `market_snapshots` tables
+  from models.py (used when DATABASE_URL is set)
+- SQLiteNewsStore / SQLiteMarketStore: a local SQLite file, safe for several uvicorn
+  workers on one machine
+
+A news entry is a dict: {"timestamp": iso8601, "articles": [...], "fundamentals": {...} | None,
+"watermark": {"page_age": iso8601, "seen": {url: page_age}} | None}. The watermark records
+what earlier refreshes already fetched, so the next one only searches and scores newer articles.
+A market entry is the price_store summary for one symbol (last price, returns, 52W range).
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+NEWS_DB_PATH = os.getenv("NEWS_DB_PATH", "news_cache.db")
+SQLITE_MAX_VARIABLES = 500  # Stay well below SQLite's bound-parameter limit for IN (...) lookups
+
+
+def parse_timestamp(value):
+    """Parses an entry timestamp; naive values (older cache.json entries) are taken as local time."""
+    ts = datetime.fromisoformat(value) if isinstance(value, str) else value
+    return ts.astimezone() if ts.tzinfo is None else ts
+
+
+class SQLiteNewsStore:
+    """News cache in a local SQLite file (WAL mode, one row per symbol)."""
+
+    def __init__(self, path=NEWS_DB_PATH):
+        self.path = path
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS news_cache (
+                    symbol       TEXT PRIMARY KEY,
+                    timestamp    TEXT NOT NULL,
+                    articles     TEXT NOT NULL,
+                    fundamentals TEXT,
+                    watermark    TEXT
+                )
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(news_cache)")}
+            if "watermark" not in columns:  # Files created before incremental refreshes
+                conn.execute("ALTER TABLE news_cache ADD COLUMN watermark TEXT")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # A short-lived connection per call keeps this usable from worker threads;
+        # the timeout makes concurrent writers from other processes wait instead of failing.
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _get_many(self, symbols):
+        symbols = list(dict.fromkeys(symbols))
+        entries = {}
+        conn = self._connect()
+        try:
+            for i in range(0, len(symbols), SQLITE_MAX_VARIABLES):
+                chunk = symbols[i:i + SQLITE_MAX_VARIABLES]
+                rows = conn.execute(
+                    f"SELECT symbol, timestamp, articles, fundamentals, watermark FROM news_cache "
+                    f"WHERE symbol IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                for symbol, timestamp, articles, fundamentals, watermark in rows:
+                    entries[symbol] = {
+                        "timestamp": timestamp,
+                        "articles": json.loads(articles),
+                        "fundamentals": json.loads(fundamentals) if fundamentals else None,
+                        "watermark": json.loads(watermark) if watermark else None,
+                    }
+        finally:
+            conn.close()
+        return entries
+
+    def _upsert(self, symbol, entry):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    """
+                    INSERT INTO news_cache (symbol, timestamp, articles, fundamentals, watermark)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(symbol) DO UPDATE SET
+                        timestamp = excluded.timestamp,
+                        articles = excluded.articles,
+                        fundamentals = excluded.fundamentals,
+                        watermark = excluded.watermark
+                    """,
+                    (
+                        symbol,
+                        entry["timestamp"],
+                        json.dumps(entry.get("articles", [])),
+                        json.dumps(entry["fundamentals"]) if entry.get("fundamentals") is not None else None,
+                        json.dumps(entry["watermark"]) if entry.get("watermark") else None,
+                    ),
+                )
+        finally:
+            conn.close()
+
+    async def get_many(self, symbols):
+        """Returns {symbol: entry} for the requested symbols that have a cached entry."""
+        return await asyncio.to_thread(self._get_many, symbols)
+
+    async def upsert(self, symbol, entry):
+        """Atomically replaces the cached entry for one symbol."""
+        await asyncio.to_thread(self._upsert, symbol, entry)
+
+
+class SQLiteMarketStore:
+    """Market-data summaries in the same SQLite file as the news cache (one row per symbol)."""
+
+    def __init__(self, path=NEWS_DB_PATH):
+        self.path = path
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS market_snapshot (
+                    symbol     TEXT PRIMARY KEY,
+                    data       TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _get_many(self, symbols, max_age_seconds):
+        symbols = list(dict.fromkeys(symbols))
+        cutoff = time.time() - max_age_seconds
+        found = {}
+        conn = self._connect()
+        try:
+            for i in range(0, len(symbols), SQLITE_MAX_VARIABLES):
+                chunk = symbols[i:i + SQLITE_MAX_VARIABLES]
+                rows = conn.execute(
+                    f"SELECT symbol, data FROM market_snapshot "
+                    f"WHERE symbol IN ({','.join('?' * len(chunk))}) AND updated_at >= ?",
+                    [*chunk, cutoff],
+                )
+                found.update((symbol, json.loads(data)) for symbol, data in rows)
+        finally:
+            conn.close()
+        return found
+
+    def _upsert_many(self, items):
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT INTO market_snapshot (symbol, data, updated_at) VALUES (?, ?, ?)
+                    ON CONFLICT(symbol) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at
+                    """,
+                    [(symbol, json.dumps(data), now) for symbol, data in items.items()],
+                )
+        finally:
+            conn.close()
+
+    async def get_many(self, symbols, max_age_seconds):
+        """Returns {symbol: summary} for the symbols stored within the last `max_age_seconds`."""
+        return await asyncio.to_thread(self._get_many, symbols, max_age_seconds)
+
+    async def upsert_many(self, items):
+        """Stores {symbol: summary}, replacing older summaries."""
+        if items:
+            await asyncio.to_thread(self._upsert_many, items)
+
+
+class CachedNewsStore:
+    """News cache in the `cached_news` table, one row per symbol shared by every user."""
+
+    def __init__(self, session_maker):
+        self.session_maker = session_maker
+
+    @staticmethod
+    def _to_entry(row):
+        return {
+            "timestamp": row.timestamp.isoformat(),
+            "articles": row.articles,
+            "fundamentals": row.fundamentals,
+            "watermark": row.watermark,
+        }
+
+    async def get_many(self, symbols):
+        """Returns {symbol: entry} for the requested symbols that have a cached entry."""
+        from sqlalchemy import select
+        from models import CachedNews
+
+        async with self.session_maker() as session:
+            rows = await session.execute(select(CachedNews).where(CachedNews.symbol.in_(list(symbols))))
+            return {row.symbol: self._to_entry(row) for row in rows.scalars()}
+
+    async def upsert(self, symbol, entry):
+        """Replaces the cached entry for one symbol in a single statement."""
+        from sqlalchemy.dialects.postgresql import insert
+        from models import CachedNews
+
+        values = {
+            "symbol": symbol,
+            "articles": entry.get("articles", []),
+            "fundamentals": entry.get("fundamentals"),
+            "watermark": entry.get("watermark"),
+            "timestamp": parse_timestamp(entry["timestamp"]),
+        }
+        # ON CONFLICT on the unique symbol makes concurrent writers from other workers safe
+        # without a read-then-write round trip or an advisory lock.
+        stmt = insert(CachedNews).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CachedNews.symbol],
+            set_={key: stmt.excluded[key] for key in ("articles", "fundamentals", "watermark", "timestamp")},
+        )
+        async with self.session_maker() as session, session.begin():
+            await session.execute(stmt)
+
+
+class MarketSnapshotStore:
+    """Market-data summaries in the `market_snapshots` table, one row per symbol shared by every user."""
+
+    def __init__(self, session_maker):
+        self.session_maker = session_maker
+
+    async def get_many(self, symbols, max_age_seconds):
+        """Returns {symbol: summary} for the symbols stored within the last `max_age_seconds`."""
+        from sqlalchemy import select
+        from models import MarketSnapshot
+
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+        async with self.session_maker() as session:
+            rows = await session.execute(
+                select(MarketSnapshot.symbol, MarketSnapshot.data)
+                .where(MarketSnapshot.symbol.in_(list(symbols)), MarketSnapshot.updated_at >= cutoff)
+            )
+            return {symbol: data for symbol, data in rows}
+
+    async def upsert_many(self, items):
+        """Stores {symbol: summary}, replacing older summaries."""
+        from sqlalchemy.dialects.postgresql import insert
+        from models import MarketSnapshot
+
+        if not items:
+            return
+        now = datetime.now(timezone.utc)
+        # Rows in a fixed order so two workers upserting overlapping symbols can't deadlock.
+        stmt = insert(MarketSnapshot).values(
+            [{"symbol": symbol, "data": data, "updated_at": now} for symbol, data in sorted(items.items())]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MarketSnapshot.symbol],
+            set_={"data": stmt.excluded.data, "updated_at": stmt.excluded.updated_at},
+        )
+        async with self.session_maker() as session, session.begin():
+            await session.execute(stmt)
+
+
+def open_news_store():
+    """Picks the Postgres-backed store when DATABASE_URL is configured, else the local SQLite file."""
+    if os.getenv("DATABASE_URL"):
+        from database import async_session_maker
+        logging.info("News cache: using the cached_news table")
+        return CachedNewsStore(async_session_maker)
+    logging.info(f"News cache: using SQLite file {NEWS_DB_PATH}")
+    return SQLiteNewsStore()
+
+
+def open_market_store():
+    """Same choice as open_news_store, for the shared market-data summaries."""
+    if os.getenv("DATABASE_URL"):
+        from database import async_session_maker
+        return MarketSnapshotStore(async_session_maker)
+    return SQLiteMarketStore()
@@ -0,0 +1,96 @@
+# prefilter.py
+"""
+Cheap local filtering that runs before any article reaches OpenAI.
+
+1. Near-duplicate collapsing: syndicated copies of one story show up under different URLs
+   with slightly reworded titles. A 64-bit SimHash over each article's title + description
+   catches them; the first copy (from the highest-priority search phrase) is kept.
+2. Keyword match: articles whose text shares no term with the company name, ticker or
+   aliases are dropped. Generic words in company names (e.g. "india", "limited") are not
+   used as terms, so they can't make an unrelated article match.
+"""
+import hashlib
+import os
+import re
+from collections import Counter
+
+NEAR_DUP_MAX_DISTANCE = int(os.getenv("NEAR_DUP_MAX_DISTANCE", "6"))  # Max differing SimHash bits for a duplicate
+SIMHASH_BITS = 64
+
+# Words in company names that say nothing about which company an article is about.
+GENERIC_NAME_TERMS = {
+    "limited", "ltd", "the", "and", "of", "co", "company", "corporation", "corp", "inc", "india",
+    "indian", "industries", "services", "group", "holdings", "enterprises", "pvt", "private", "plc",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def article_text(article):
+    return f"{article.get('title') or ''} {article.get('description') or ''}"
+
+
+def simhash(tokens):
+    """64-bit SimHash over word unigrams and bigrams."""
+    features = Counter(tokens)
+    features.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    weights = [0] * SIMHASH_BITS
+    for feature, count in features.items():
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += count if h >> bit & 1 else -count
+    return sum(1 << bit for bit, w in enumerate(weights) if w > 0)
+
+
+def collapse_near_duplicates(articles, max_distance=NEAR_DUP_MAX_DISTANCE, known=()):
+    """
+    Keeps the first article of every group whose SimHashes are within `max_distance` bits.
+    Articles that duplicate one in `known` (kept by an earlier refresh) are dropped as well.
+    """
+    kept = []
+    fingerprints = [simhash(tokenize(article_text(art))) for art in known]
+    for art in articles:
+        fp = simhash(tokenize(article_text(art)))
+        if any(bin(fp ^ other).count("1") <= max_distance for other in fingerprints):
+            continue
+        fingerprints.append(fp)
+        kept.append(art)
+    return kept
+
+
+def company_terms(company_name, symbol="", aliases=()):
+    """Query terms for a company: distinctive name tokens, the ticker and any alias tokens."""
+    terms = {t for t in tokenize(company_name) if t not in GENERIC_NAME_TERMS and len(t) > 1}
+    terms.update(tokenize(symbol))
+    for alias in aliases:
+        terms.update(t for t in tokenize(alias) if t not in GENERIC_NAME_TERMS)
+    return terms
+
+
+def matches_terms(tokens, terms):
+    """Whether a tokenised article contains any of `terms`."""
+    return not terms.isdisjoint(tokens)
+
+
+def prefilter_articles(articles, company_name, symbol="", aliases=(), known=()):
+    """
+    Runs both stages and returns (kept_articles, stats); stats counts what each stage removed:
+    {"input", "near_duplicates", "no_lexical_match", "kept"}. `known` are articles already
+    kept earlier, so new copies of them count as near-duplicates.
+    """
+    unique = collapse_near_duplicates(articles, known=known)
+    terms = company_terms(company_name, symbol, aliases)
+    if terms:
+        relevant = [a for a in unique if matches_terms(tokenize(article_text(a)), terms)]
+    else:
+        relevant = unique
+    return relevant, {
+        "input": len(articles),
+        "near_duplicates": len(articles) - len(unique),
+        "no_lexical_match": len(unique) - len(relevant),
+        "kept": len(relevant),
+    }
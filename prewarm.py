@@ -0,0 +1,165 @@
+# prewarm.py
+"""
+Fills the dashboard's caches for every held symbol ahead of visitors, so neither a cold
+start nor the first page view after the market opens pays for a full rebuild.
+
+- Prices: the local price store is synced, with the symbols split across worker processes.
+  Each process downloads its share and turns the yfinance frames into bars in parallel. The
+  summaries then go to the shared market store.
+- News and metadata: symbols whose news is missing, or due for a refresh, are refreshed,
+  which also brings their metadata up to date. The other symbols only get their metadata
+  checked. Refreshes share the usual MAX_CONCURRENT_SYMBOLS limit, and their prefilter step
+  runs in the same process pool.
+
+Run it on its own, or have the app run it on startup (PREWARM_ON_STARTUP=1). In that case
+uvicorn starts accepting connections once it finishes, or after
+PREWARM_STARTUP_TIMEOUT_SECONDS, whichever comes first:
+
+    python prewarm.py                        # every held symbol
+    python prewarm.py --symbols INFY,TCS
+    python prewarm.py --url https://fintech-app.onrender.com
+
+The --url form asks a running dashboard to prewarm itself, and is what the optional Render
+cron job uses. A cron job has its own disk, so it can't fill the web service's SQLite and price files.
+Its request also wakes a free instance that has spun down. PREWARM_TOKEN must be set on both
+sides.
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from metrics import timed
+from price_store import sync_in_process
+
+PREWARM_PROCESSES = int(os.getenv("PREWARM_PROCESSES", str(min(4, os.cpu_count() or 1))))
+PREWARM_TOKEN = os.getenv("PREWARM_TOKEN")
+PRICE_CHUNK_SIZE = 50  # Symbols per worker-process price sync
+REMOTE_ATTEMPTS = 3  # A spun-down free instance can answer with errors while it boots
+REMOTE_TIMEOUT_SECONDS = 180
+
+
+async def warm_prices(dashboard, symbols, pool):
+    """Syncs the price store and publishes the summaries; returns how many symbols have a price."""
+    if pool is None:
+        await asyncio.to_thread(dashboard.price_store.sync, symbols)
+    else:
+        loop = asyncio.get_running_loop()
+        chunks = [symbols[i:i + PRICE_CHUNK_SIZE] for i in range(0, len(symbols), PRICE_CHUNK_SIZE)]
+        results = await asyncio.gather(
+            *(loop.run_in_executor(pool, sync_in_process, dashboard.price_store.directory, chunk) for chunk in chunks),
+            return_exceptions=True,
+        )
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, BaseException):
+                logging.error(f"[prewarm] Price sync failed for {chunk[0]}..{chunk[-1]}: {result!r}")
+    summary = await asyncio.to_thread(dashboard.price_store.summary, symbols)
+    priced = {s: v for s, v in summary.items() if v.get("last_price") is not None}
+    await dashboard.market_store.upsert_many(priced)
+    dashboard._market_snapshot.update(symbols=frozenset(symbols), fetched_at=time.monotonic(), data=summary)
+    return len(priced)
+
+
+async def warm_news(dashboard, symbols):
+    """Refreshes news that is missing or due (metadata with it) and checks the rest's metadata."""
+    cache = await dashboard.news_store.get_many(symbols)
+    due_after = timedelta(hours=dashboard.CACHE_DURATION_HOURS) - timedelta(minutes=dashboard.REFRESH_AHEAD_MINUTES)
+    due = [s for s in symbols if s not in cache or dashboard.cache_age(cache[s]) >= due_after]
+    current = [s for s in symbols if s not in due]
+    semaphore = asyncio.Semaphore(dashboard.MAX_CONCURRENT_SYMBOLS)
+
+    async def check_metadata(symbol):
+        async with semaphore:
+            return await dashboard.resolve_metadata(symbol)
+
+    results = await asyncio.gather(
+        *(dashboard.refresh_symbol(s) for s in due), *(check_metadata(s) for s in current), return_exceptions=True,
+    )
+    for symbol, result in zip(current, results[len(due):]):
+        if isinstance(result, BaseException):
+            logging.error(f"[prewarm] Metadata check failed for {symbol}: {result!r}")
+    return sum(r is not None and not isinstance(r, BaseException) for r in results[:len(due)]), len(due)
+
+
+async def prewarm_caches(symbols=None, processes=PREWARM_PROCESSES):
+    """Fills the price, news and metadata caches for `symbols` (default: every holding)."""
+    import app as dashboard
+
+    if symbols is None:
+        holdings = await asyncio.to_thread(dashboard.load_holdings)
+        symbols = [h["tradingsymbol"].strip() for h in holdings if h.get("tradingsymbol", "").strip()]
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        logging.info("[prewarm] No holdings to prewarm")
+        return {"symbols": 0}
+
+    start = time.perf_counter()
+    # spawn rather than fork: the app's threads (and locks) must not be copied into the workers.
+    pool = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn")) if processes > 0 else None
+    dashboard._cpu_pool = pool
+    try:
+        with timed("prewarm"):
+            priced, (refreshed, due) = await asyncio.gather(
+                warm_prices(dashboard, symbols, pool), warm_news(dashboard, symbols),
+            )
+    finally:
+        dashboard._cpu_pool = None
+        if pool is not None:
+            await asyncio.to_thread(pool.shutdown)
+    stats = {
+        "symbols": len(symbols), "priced": priced, "news_refreshed": refreshed, "news_due": due,
+        "seconds": round(time.perf_counter() - start, 1),
+    }
+    logging.info(f"[prewarm] Done: {stats}")
+    return stats
+
+
+def request_remote_prewarm(url, token=PREWARM_TOKEN):
+    """Asks the dashboard at `url` to prewarm itself; returns its response body."""
+    request = urllib.request.Request(
+        f"{url.rstrip('/')}/api/prewarm", method="POST", headers={"Authorization": f"Bearer {token or ''}"},
+    )
+    for attempt in range(1, REMOTE_ATTEMPTS + 1):
+        try:
+            with urllib.request.urlopen(request, timeout=REMOTE_TIMEOUT_SECONDS) as response:
+                return response.read().decode()
+        except urllib.error.HTTPError as e:
+            if e.code < 500 or attempt == REMOTE_ATTEMPTS:
+                raise
+            logging.warning(f"[prewarm] {url} answered {e.code}; retrying")
+        except urllib.error.URLError as e:
+            if attempt == REMOTE_ATTEMPTS:
+                raise
+            logging.warning(f"[prewarm] Could not reach {url} ({e.reason}); retrying")
+        time.sleep(30)
+
+
+async def run_local(symbols, processes):
+    import app as dashboard
+
+    try:
+        return await prewarm_caches(symbols, processes)
+    finally:
+        await dashboard.brave_client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill the dashboard's price, news and metadata caches.")
+    parser.add_argument("--symbols", type=lambda v: [s.strip() for s in v.split(",") if s.strip()],
+                        help="comma-separated symbols (default: every holding)")
+    parser.add_argument("--processes", type=int, default=PREWARM_PROCESSES,
+                        help=f"worker processes for price syncs and prefiltering; 0 runs everything in-process (default: {PREWARM_PROCESSES})")
+    parser.add_argument("--url", help="ask the dashboard running at this URL to prewarm itself instead")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.url:
+        print(request_remote_prewarm(args.url))
+    else:
+        print(asyncio.run(run_local(args.symbols, args.processes)))
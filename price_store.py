@@ -0,0 +1,170 @@
+# price_store.py
+"""
+Local daily OHLC store for all held symbols.
+
+Each symbol is one `.npy` file of daily bars, opened memory-mapped. A sync downloads only
+the bars newer than what is on disk, for every symbol in one multi-ticker yfinance request
+(new symbols get a little over a year of history in a second request). Returns over 1D to 1Y and the
+52-week range are computed with numpy over a symbols x days matrix, so longer windows
+cost nothing extra on the network.
+"""
+import logging
+import os
+import warnings
+from datetime import date, timedelta
+from urllib.parse import quote
+
+import numpy as np
+
+PRICE_STORE_DIR = os.getenv("PRICE_STORE_DIR", "price_store")
+HISTORY_DAYS = 400  # Initial download for new symbols: NSE trades ~248 sessions a year, so "1y" is short of WINDOW_BARS
+WINDOW_BARS = 253  # Enough bars for the 1Y return (252 sessions back) and the 52-week range
+BAR_DTYPE = np.dtype([
+    ("date", "datetime64[D]"), ("open", "f8"), ("high", "f8"),
+    ("low", "f8"), ("close", "f8"), ("volume", "f8"),
+])
+# Field name -> sessions back from the latest close.
+RETURN_WINDOWS = {
+    "day_change_pct": 1,
+    "week_change_pct": 5,
+    "month_change_pct": 21,
+    "three_month_change_pct": 63,
+    "year_change_pct": 252,
+}
+SUMMARY_FIELDS = ("last_price", *RETURN_WINDOWS, "high_52w", "low_52w")
+
+
+def yf_ticker(symbol):
+    return f"{symbol}.NS"
+
+
+class PriceStore:
+    def __init__(self, directory=PRICE_STORE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, symbol):
+        return os.path.join(self.directory, f"{quote(symbol, safe='')}.npy")
+
+    def load(self, symbol):
+        """All stored bars for `symbol` (memory-mapped, oldest first), or an empty array."""
+        try:
+            return np.load(self._path(symbol), mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return np.empty(0, dtype=BAR_DTYPE)
+
+    def _write(self, symbol, bars):
+        # Write-then-rename so readers (and other workers) never see a half-written file.
+        path = self._path(symbol)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, bars)
+        os.replace(tmp, path)
+
+    def _download(self, symbols, **kwargs):
+        """One multi-ticker yfinance request; returns {symbol: bars array} for symbols that had data."""
+        import yfinance as yf  # Imported on first use; it pulls in pandas and is slow to load
+
+        tickers = [yf_ticker(s) for s in symbols]
+        data = yf.download(tickers, progress=False, auto_adjust=False, group_by="column", threads=True, **kwargs)
+        if data is None or data.empty:
+            return {}
+        bars = {}
+        for symbol, ticker in zip(symbols, tickers):
+            try:
+                frame = data.xs(ticker, axis=1, level=1) if data.columns.nlevels > 1 else data
+            except KeyError:
+                continue
+            frame = frame.dropna(subset=["Close"])
+            if frame.empty:
+                continue
+            rows = np.empty(len(frame), dtype=BAR_DTYPE)
+            rows["date"] = frame.index.values.astype("datetime64[D]")
+            for field, column in (("open", "Open"), ("high", "High"), ("low", "Low"), ("close", "Close"), ("volume", "Volume")):
+                rows[field] = frame[column].to_numpy(dtype="f8", na_value=np.nan)
+            bars[symbol] = rows
+        return bars
+
+    def _merge(self, symbol, new_bars):
+        """Appends bars from the stored last date onwards; the last stored bar is replaced since it may be intraday."""
+        stored = self.load(symbol)
+        if len(stored):
+            new_bars = new_bars[new_bars["date"] >= stored["date"][-1]]
+            if not len(new_bars):
+                return 0
+            merged = np.concatenate([stored[stored["date"] < new_bars["date"][0]], new_bars])
+        else:
+            merged = new_bars
+        self._write(symbol, merged)
+        return len(new_bars)
+
+    def sync(self, symbols):
+        """Brings the store up to date for `symbols`, downloading only bars newer than what is stored."""
+        symbols = list(dict.fromkeys(symbols))
+        last_dates = {}
+        for symbol in symbols:
+            bars = self.load(symbol)
+            if len(bars):
+                last_dates[symbol] = bars["date"][-1].item()
+
+        existing = [s for s in symbols if s in last_dates]
+        missing = [s for s in symbols if s not in last_dates]
+        downloaded = {}
+        if existing:
+            start = min(last_dates[s] for s in existing)
+            downloaded.update(self._download(existing, start=start.isoformat(), end=(date.today() + timedelta(days=1)).isoformat()))
+        if missing:
+            start = date.today() - timedelta(days=HISTORY_DAYS)
+            downloaded.update(self._download(missing, start=start.isoformat(), end=(date.today() + timedelta(days=1)).isoformat()))
+
+        appended = sum(self._merge(symbol, bars) for symbol, bars in downloaded.items())
+        absent = [s for s in symbols if s not in downloaded and s not in last_dates]
+        logging.info(
+            f"[prices] Synced {len(symbols)} symbols ({len(missing)} new): {appended} bars written"
+            + (f"; no data for {', '.join(absent)}" if absent else "")
+        )
+
+    def matrix(self, symbols, fields=("close",), window=WINDOW_BARS):
+        """
+        {field: array of shape (len(symbols), window)} with each symbol's most recent bars
+        right-aligned; symbols with shorter (or no) history are NaN-padded on the left.
+        """
+        out = {field: np.full((len(symbols), window), np.nan) for field in fields}
+        for i, symbol in enumerate(symbols):
+            bars = self.load(symbol)[-window:]
+            if len(bars):
+                for field in fields:
+                    out[field][i, window - len(bars):] = bars[field]
+        return out
+
+    def summary(self, symbols):
+        """Last price, 1D/1W/1M/3M/1Y % change and 52-week high/low for every symbol (None where unknown)."""
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+        m = self.matrix(symbols, fields=("close", "high", "low"))
+        closes = m["close"]
+        last = closes[:, -1]
+        columns = {"last_price": last}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for field, back in RETURN_WINDOWS.items():
+                ref = closes[:, -1 - back]
+                columns[field] = np.where(ref > 0, (last - ref) / ref * 100, np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # Symbols with no bars give all-NaN rows -> NaN
+            columns["high_52w"] = np.nanmax(m["high"][:, -252:], axis=1)
+            columns["low_52w"] = np.nanmin(m["low"][:, -252:], axis=1)
+
+        return {
+            symbol: {
+                field: (None if np.isnan(values[i]) else float(values[i]))
+                for field, values in columns.items()
+            }
+            for i, symbol in enumerate(symbols)
+        }
+
+
+def sync_in_process(directory, symbols):
+    """Worker-process entry point (see prewarm.py): syncs `symbols` into the store at `directory`."""
+    PriceStore(directory).sync(symbols)
+    return len(symbols)
@@ -0,0 +1,129 @@
+# symbol_metadata.py
+"""
+Long-lived per-symbol metadata: the company info a news refresh needs from yfinance
+(name, sector, business summary) and the GPT-generated search phrases. Both almost never
+change, so they are kept for SYMBOL_METADATA_TTL_DAYS and a refresh with fresh metadata
+goes straight to searching.
+
+The record also carries the card's trailing fundamentals (P/E, EPS, ROE). P/E moves with the
+price, so they have their own SYMBOL_FUNDAMENTALS_TTL_HOURS (the news refresh cadence) and
+are re-read from `.info` on that schedule without restarting the metadata's TTL.
+
+Manual corrections live in a JSON file (SYMBOL_OVERRIDES_PATH), keyed by symbol:
+
+    {"HDFCLIFE": {"name": "HDFC Life Insurance", "aliases": ["HDFC Life"],
+                  "phrases": ["HDFC Life Insurance", "HDFC Life premium growth"]}}
+
+Any of "name", "sector", "description", "phrases" and "aliases" may be given; they win over
+what yfinance and GPT produced. Aliases are extra names the prefilter accepts as a match.
+The file is re-read whenever it changes, so edits apply without a restart.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from news_store import NEWS_DB_PATH
+
+SYMBOL_METADATA_TTL_DAYS = float(os.getenv("SYMBOL_METADATA_TTL_DAYS", "7"))
+SYMBOL_FUNDAMENTALS_TTL_HOURS = float(os.getenv("SYMBOL_FUNDAMENTALS_TTL_HOURS", "4"))
+SYMBOL_OVERRIDES_PATH = os.getenv("SYMBOL_OVERRIDES_PATH", "symbol_overrides.json")
+OVERRIDE_FIELDS = ("name", "sector", "description", "phrases", "aliases")
+
+
+class MetadataStore:
+    """Metadata records in the news cache's SQLite file, one row per symbol."""
+
+    def __init__(self, path=NEWS_DB_PATH, ttl_days=SYMBOL_METADATA_TTL_DAYS):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS symbol_metadata (
+                    symbol     TEXT PRIMARY KEY,
+                    data       TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, symbol):
+        """Returns (record, is_fresh) for `symbol`, or (None, False) when nothing is stored."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT data, updated_at FROM symbol_metadata WHERE symbol = ?", (symbol,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None, False
+        data, updated_at = row
+        return json.loads(data), time.time() - updated_at < self.ttl_seconds
+
+    def set(self, symbol, record, touch=True):
+        """Stores `record`; with touch=False an existing row keeps its age (e.g. when only fundamentals changed)."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    """
+                    INSERT INTO symbol_metadata (symbol, data, updated_at) VALUES (?, ?, ?)
+                    ON CONFLICT(symbol) DO UPDATE SET data = excluded.data,
+                        updated_at = CASE WHEN ? THEN excluded.updated_at ELSE symbol_metadata.updated_at END
+                    """,
+                    (symbol, json.dumps(record), time.time(), touch),
+                )
+        finally:
+            conn.close()
+
+
+class SymbolOverrides:
+    """The overrides file, reloaded when its modification time changes."""
+
+    def __init__(self, path=SYMBOL_OVERRIDES_PATH):
+        self.path = path
+        self._mtime = None
+        self._overrides = {}
+        self._lock = threading.Lock()
+
+    def _reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            self._mtime, self._overrides = None, {}
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path) as f:
+                raw = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.error(f"⚠️ Could not read symbol overrides from {self.path}: {e}")
+            return
+        self._overrides = {
+            symbol.strip().upper(): {k: v for k, v in fields.items() if k in OVERRIDE_FIELDS}
+            for symbol, fields in raw.items() if isinstance(fields, dict)
+        }
+        self._mtime = mtime
+        logging.info(f"[metadata] Loaded overrides for {len(self._overrides)} symbols from {self.path}")
+
+    def get(self, symbol):
+        with self._lock:
+            self._reload()
+            return self._overrides.get(symbol.upper(), {})
+
+
+def apply_overrides(record, override):
+    """The record with the override's fields on top; phrases from an override replace the generated ones."""
+    merged = {**record, **{k: v for k, v in override.items() if v}}
+    merged.setdefault("aliases", [])
+    return merged